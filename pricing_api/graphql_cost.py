@@ -0,0 +1,125 @@
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, OperationDefinitionNode,
+    get_named_type, get_nullable_type, is_list_type, value_from_ast_untyped,
+)
+
+QueryCost = namedtuple('QueryCost', ['rows', 'resolvers'])
+
+# Arguments that bound how many items a list field returns
+LIMIT_ARGUMENTS = ('limit', 'first', 'last')
+CATALOG_SIZE_KEY = 'graphql:catalog-size'
+
+
+def catalog_size():
+    """Number of products, cached for GRAPHQL_CATALOG_SIZE_TIMEOUT seconds"""
+    size = cache.get(CATALOG_SIZE_KEY)
+    if size is None:
+        from products.models import Product
+
+        size = Product.objects.count()
+        cache.set(CATALOG_SIZE_KEY, size, getattr(settings, 'GRAPHQL_CATALOG_SIZE_TIMEOUT', 60))
+    return size
+
+
+def list_size_estimates():
+    """
+    Expected list sizes for unbounded list fields, overridable in settings.
+    ``allProducts`` returns the whole catalog, so it is sized from the
+    product count (only looked up when a query selects it).
+    """
+    return {
+        'allProducts': catalog_size,
+        'productsByCategory': 200,
+        'priceHistory': getattr(settings, 'PRODUCT_HISTORY_LIMIT', 10),
+        **getattr(settings, 'GRAPHQL_LIST_SIZE_ESTIMATES', {}),
+    }
+
+
+def _limit_argument(node, variables):
+    for argument in node.arguments:
+        if argument.name.value in LIMIT_ARGUMENTS:
+            value = value_from_ast_untyped(argument.value, variables)
+            if isinstance(value, int):
+                return max(value, 0)
+    return None
+
+
+def estimate_query_cost(schema, document, operation_name=None, variables=None):
+    """
+    Estimate rows fetched and resolvers run by an operation, before executing it.
+
+    Every list field multiplies the cost of its children by its size: the
+    ``limit`` argument when given (on the field itself or on the page object
+    wrapping it, like ``priceChanges``), otherwise the estimate for that
+    field. Introspection fields are free.
+    """
+    variables = variables or {}
+    estimates = list_size_estimates()
+    default_size = getattr(settings, 'GRAPHQL_DEFAULT_LIST_SIZE', 100)
+    fragments = {}
+    operations = []
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            if operation_name is None or (definition.name and definition.name.value == operation_name):
+                operations.append(definition)
+        else:
+            fragments[definition.name.value] = definition
+
+    rows = resolvers = 0
+
+    def visit(selection_set, parent_type, multiplier, page_size=None):
+        nonlocal rows, resolvers
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    visit(fragment.selection_set, schema.get_type(fragment.type_condition.name.value), multiplier, page_size)
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment_type = schema.get_type(selection.type_condition.name.value) if selection.type_condition else parent_type
+                visit(selection.selection_set, fragment_type, multiplier, page_size)
+                continue
+            if not isinstance(selection, FieldNode) or selection.name.value.startswith('__'):
+                continue
+
+            resolvers += multiplier
+            field = getattr(parent_type, 'fields', {}).get(selection.name.value)
+            if field is None or selection.selection_set is None:
+                continue
+
+            limit = _limit_argument(selection, variables)
+            count = multiplier
+            if is_list_type(get_nullable_type(field.type)):
+                if limit is None:
+                    limit = page_size if page_size is not None else estimates.get(selection.name.value, default_size)
+                    if callable(limit):
+                        limit = limit()
+                count = multiplier * limit
+                limit = None
+            rows += count
+            visit(selection.selection_set, get_named_type(field.type), count, limit)
+
+    for operation in operations[:1]:
+        root = schema.get_root_type(operation.operation)
+        visit(operation.selection_set, root, 1)
+
+    return QueryCost(rows, resolvers)
+
+
+def check_query_cost(cost):
+    """Errors for a QueryCost over the GRAPHQL_MAX_ROWS / GRAPHQL_MAX_RESOLVERS budgets"""
+    max_rows = getattr(settings, 'GRAPHQL_MAX_ROWS', 50000)
+    max_resolvers = getattr(settings, 'GRAPHQL_MAX_RESOLVERS', 250000)
+    errors = []
+    if cost.rows > max_rows:
+        errors.append(GraphQLError(
+            f"Query is too expensive: an estimated {cost.rows} rows exceeds the budget of {max_rows}."
+        ))
+    if cost.resolvers > max_resolvers:
+        errors.append(GraphQLError(
+            f"Query is too expensive: an estimated {cost.resolvers} resolver calls exceeds the budget of {max_resolvers}."
+        ))
+    return errors
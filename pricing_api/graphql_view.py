@@ -0,0 +1,190 @@
+import hashlib
+import json
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene.validation import depth_limit_validator
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.debug import DjangoDebugMiddleware
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult, FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode,
+    OperationType, execute, get_operation_ast, parse, specified_rules, validate,
+)
+from .graphql_cost import check_query_cost, estimate_query_cost
+
+PERSISTED_QUERY_KEY = 'graphql-persisted-query:{}'
+
+
+@lru_cache(maxsize=getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+def prepare_document(schema, query):
+    """
+    Parse and validate a query once; repeated documents reuse the AST.
+    Returns (document, errors).
+    """
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return None, [e]
+
+    rules = [*specified_rules, depth_limit_validator(getattr(settings, 'GRAPHQL_MAX_DEPTH', 8))]
+    errors = validate(schema, document, rules, graphene_settings.MAX_VALIDATION_ERRORS)
+    return document, errors
+
+
+def resolve_persisted_query(query, extensions):
+    """
+    Automatic persisted queries: clients send only the sha256 of a document
+    they registered earlier. Returns (query text, registry key to store it
+    under once it validates, or None), or raises GraphQLError.
+    """
+    persisted = (extensions or {}).get('persistedQuery')
+    if not persisted:
+        return query, None
+
+    sha256 = persisted.get('sha256Hash')
+    if not sha256:
+        raise GraphQLError('PersistedQueryNotSupported')
+
+    key = PERSISTED_QUERY_KEY.format(sha256)
+    if query is None:
+        query = cache.get(key)
+        if query is None:
+            raise GraphQLError('PersistedQueryNotFound')
+        return query, None
+
+    if len(query) > getattr(settings, 'GRAPHQL_PERSISTED_QUERY_MAX_LENGTH', 10000):
+        raise GraphQLError('Persisted query is too large to register')
+    if hashlib.sha256(query.encode()).hexdigest() != sha256:
+        raise GraphQLError('provided sha does not match query')
+    return query, key
+
+
+def register_persisted_query(key, query):
+    """Store a validated document; entries expire, clients re-register on PersistedQueryNotFound"""
+    cache.set(key, query, getattr(settings, 'GRAPHQL_PERSISTED_QUERY_TIMEOUT', 86400))
+
+
+def selects_debug(document, operation_ast):
+    """Whether the operation selects the root ``_debug`` field, directly or through fragments"""
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+    }
+    seen = set()
+
+    def visit(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if selection.name.value == '_debug':
+                    return True
+            elif isinstance(selection, InlineFragmentNode):
+                if visit(selection.selection_set):
+                    return True
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name not in seen and name in fragments:
+                    seen.add(name)
+                    if visit(fragments[name].selection_set):
+                        return True
+        return False
+
+    return visit(operation_ast.selection_set)
+
+
+class PricingGraphQLView(GraphQLView):
+    """
+    GraphQLView with persisted queries, cached parse/validation, depth and
+    cost limits, and ``_debug`` instrumentation only when it is selected
+    (by a staff user).
+    """
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+        try:
+            query, persisted_key = resolve_persisted_query(query, extensions)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        schema = self.schema.graphql_schema
+        document, errors = prepare_document(schema, query)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        # Only documents that parse and validate make it into the registry
+        if persisted_key is not None:
+            register_persisted_query(persisted_key, query)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ['POST'],
+                    'Can only perform a {} operation from a POST request.'.format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        cost_errors = check_query_cost(estimate_query_cost(schema, document, operation_name, variables))
+        if cost_errors:
+            return ExecutionResult(data=None, errors=cost_errors)
+
+        middleware = self.get_middleware(request)
+        if operation_ast is not None and selects_debug(document, operation_ast):
+            # SQL and stack traces are for staff only
+            user = getattr(request, 'user', None)
+            if not (user is not None and user.is_staff):
+                return ExecutionResult(data=None, errors=[GraphQLError('_debug is only available to staff users.')])
+            middleware = [*middleware, DjangoDebugMiddleware()]
+
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': middleware,
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -21,6 +21,7 @@ class UpdatePrice(graphene.Mutation):
     def mutate(self, info, product_id, train_new, timesteps):
         from rl_pricing.trainer import PricingModelTrainer
         from products.models import Product
+        from products.price_updates import PriceDecision, apply_price_decisions
         
         try:
             product = Product.objects.get(id=product_id)
@@ -38,8 +39,7 @@ class UpdatePrice(graphene.Mutation):
             new_price = current_price * (1 + price_change)
             new_price = max(float(product.min_price), min(float(product.max_price), new_price))
             
-            product.current_price = new_price
-            product.save()
+            apply_price_decisions([PriceDecision(product.id, new_price, price_change * 100)])
             product.refresh_from_db() 
             
             return UpdatePrice(
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,11 +61,21 @@ INSTALLED_APPS = [
 
 GRAPHENE = {
     "SCHEMA": "pricing_api.schema.schema",
-    "MIDDLEWARE": [
-        "graphene_django.debug.DjangoDebugMiddleware",
-    ],
+    # DjangoDebugMiddleware is added per request, only when _debug is selected
+    "MIDDLEWARE": [],
 }
 
+# GraphQL limits (see pricing_api/graphql_view.py)
+GRAPHQL_MAX_DEPTH = 8  # deepest field nesting accepted
+GRAPHQL_MAX_ROWS = 50000  # estimated rows a single query may fetch
+GRAPHQL_MAX_RESOLVERS = 250000  # estimated resolver calls a single query may run
+GRAPHQL_DEFAULT_LIST_SIZE = 100  # assumed size of list fields without a limit argument
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256  # parsed and validated documents kept in memory
+GRAPHQL_PERSISTED_QUERY_TIMEOUT = 86400  # seconds a registered persisted query is kept
+GRAPHQL_PERSISTED_QUERY_MAX_LENGTH = 10000  # longest document (characters) accepted for registration
+GRAPHQL_CATALOG_SIZE_TIMEOUT = 60  # seconds the product count used to cost allProducts is cached
+GRAPHQL_LOADER_CHUNK_SIZE = 500  # product ids per batched relation query (keeps IN lists bounded)
+
 OAUTH2_PROVIDER = {
     'SCOPES': {
         'pricing': 'Access pricing endpoints',
@@ -151,6 +163,31 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Price snapshots are invalidated from Celery workers, so every process must
+# share one cache. Redis (already the Celery broker) serves ETag polls without
+# touching the database and increments versions atomically. Tests get a
+# process-local cache so they never need a Redis server.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_CACHE_URL', 'redis://192.168.28.144:6379/1'),
+    }
+}
+
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+CURRENT_PRICES_CACHE_TIMEOUT = 3600  # seconds a current-price snapshot is kept
+DASHBOARD_CACHE_TIMEOUT = 60  # seconds the admin dashboard summary is kept
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -208,12 +245,23 @@ CELERY_BEAT_SCHEDULE = {
     'retrain-models-daily': {
         'task': 'rl_pricing.tasks.retrain_rl_models',
         'schedule': crontab(hour=0, minute=0),  # every day at midnight
+        'kwargs': {'incremental': True},  # warm-start; falls back to full training on drift
     },
     
     'update-product-prices-every-15-minutes': {
         'task': 'rl_pricing.tasks.update_product_prices',
         'schedule': crontab(minute='*/15'),  # every 15 minutes
     },
+
+    'rollup-price-history-hourly': {
+        'task': 'products.tasks.rollup_price_history',
+        'schedule': crontab(minute=5),  # every hour
+    },
+
+    'compact-price-history-daily': {
+        'task': 'products.tasks.compact_price_history',
+        'schedule': crontab(hour=1, minute=0),  # every day at 1am
+    },
     
 
 }
@@ -222,4 +270,34 @@ CELERY_BEAT_SCHEDULE = {
 ADMIN_INTERFACE_DEFAULT_THEME = 'dark'
 
 
+# RL TRAINING
+RL_TRAINING_WORKERS = 1  # processes used by retrain_rl_models
+RL_TRAINING_TORCH_THREADS = 1  # torch threads per training process
+RL_POLICY_CACHE_SIZE = 128  # loaded models kept in memory per process
+RL_NUMPY_INFERENCE = True  # serve predictions from the .npz export instead of torch
+RL_MODEL_STALE_DAYS = 7  # models not retrained for this long count as stale on the dashboard
+RL_DRIFT_THRESHOLD = 0.5  # relative change in price/sales features that forces a full retrain
+RL_INCREMENTAL_TIMESTEPS_PER_ROW = 2  # warm-start timesteps per new history row with a price move or sale
+RL_INCREMENTAL_MIN_TIMESTEPS = 200  # smallest warm-start run when there is any new experience
+RL_REPLAY_BUFFERS = True  # keep DQN replay buffers on disk between training runs
+RL_REPLAY_BUFFER_MAX_TRANSITIONS = 10000  # newest transitions saved per product
+RL_REPLAY_BUFFER_DISK_BUDGET_MB = 512  # total size of saved buffers; oldest are evicted first
+RL_TRAINING_METRICS_INTERVAL = 10  # seconds between training metric updates on the running TrainingSession
+RL_TUNING_SEARCH_SPACE = {}  # per-algorithm overrides of rl_pricing.tuning.SEARCH_SPACE
+RL_TUNING_DIR = None  # where tune_rl_models keeps trial checkpoints (system temp dir when None)
+STARTUP_IMPORT_BUDGET_SECONDS = 2.0  # django.setup() + URL loading, checked by rl_pricing.tests
+
+
+# PRICE HISTORY
+PRICE_HISTORY_RETENTION_DAYS = 90  # raw rows older than this are compacted into rollups
+PRICE_HISTORY_EXPORT_CHUNK_SIZE = 2000  # rows fetched per cursor round trip by the streaming export
+PRODUCT_HISTORY_LIMIT = 10  # latest history entries nested in each /rest/products/ item
+PRICE_CHANGES_CURSOR_LAG_SECONDS = 30  # price_changes only serves rows at least this old, so late commits are not skipped
+ADMIN_PRICE_HISTORY_INLINE_ROWS = 20  # history rows shown inline on the product admin page
+PRICE_CHART_POINTS = 300  # points kept when downsampling admin price charts (LTTB)
+PRICE_CHART_RAW_ROWS = 3000  # longer histories are bucketed in the database before LTTB
+PRICE_CHART_MAX_BUCKETS = 2400  # hourly buckets (100 days) before switching to daily ones
+PRICE_CHART_CACHE_TIMEOUT = 3600  # seconds a rendered chart is kept; also invalidated by price updates
+
+
 
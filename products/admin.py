@@ -1,15 +1,53 @@
+from django.conf import settings
 from django.contrib import admin
-from django.utils.safestring import mark_safe
-from .models import Product, ProductCategory, ProductPriceHistory
+from django.forms.models import BaseInlineFormSet
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .charts import get_price_chart_svg
+from .models import Product, ProductCategory, ProductPriceHistory, ProductPriceRollup
 from rl_pricing.tasks import update_product_prices  # For admin action
 
+class RecentPriceHistoryFormSet(BaseInlineFormSet):
+    """Only the latest ADMIN_PRICE_HISTORY_INLINE_ROWS rows, not the product's whole history"""
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            limit = getattr(settings, 'ADMIN_PRICE_HISTORY_INLINE_ROWS', 20)
+            self._queryset = super().get_queryset()[:limit]
+        return self._queryset
+
 # Inline to display price history inside the Product detail page
 class ProductPriceHistoryInline(admin.TabularInline):
     model = ProductPriceHistory
+    formset = RecentPriceHistoryFormSet
     extra = 0
     readonly_fields = ['price', 'timestamp', 'change_percentage', 'units_sold', 'revenue']
     ordering = ['-timestamp'] 
-    verbose_name_plural = 'Price History Records'
+    verbose_name_plural = 'Latest Price History Records'
+
+class CompactedPriceHistoryFormSet(BaseInlineFormSet):
+    """Latest daily rollups of periods whose raw history rows were compacted away"""
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            limit = getattr(settings, 'ADMIN_PRICE_HISTORY_INLINE_ROWS', 20)
+            self._queryset = super().get_queryset().filter(granularity='day', compacted=True)[:limit]
+        return self._queryset
+
+# Older history falls back to rollups once raw rows are compacted
+class CompactedPriceHistoryInline(admin.TabularInline):
+    model = ProductPriceRollup
+    formset = CompactedPriceHistoryFormSet
+    extra = 0
+    fields = readonly_fields = ['bucket_start', 'last_price', 'change_percentage', 'units_sold', 'revenue', 'row_count']
+    ordering = ['-bucket_start']
+    can_delete = False
+    verbose_name_plural = 'Compacted Price History (daily rollups)'
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -26,18 +64,47 @@ class ProductAdmin(admin.ModelAdmin):
     )
     search_fields = ('name',)
     inlines = [ProductPriceHistoryInline]
-    readonly_fields = ['price_history_chart']
+    readonly_fields = ['price_history_chart', 'full_price_history']
     actions = ['trigger_update_prices']  
 
+    def get_inlines(self, request, obj):
+        if obj is not None and obj.price_rollups.filter(compacted=True).exists():
+            return [ProductPriceHistoryInline, CompactedPriceHistoryInline]
+        return self.inlines
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:product_id>/price-chart.svg',
+                self.admin_site.admin_view(self.price_chart_view),
+                name='products_product_price_chart'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def price_chart_view(self, request, product_id):
+        """ SVG of the product's price history, downsampled and cached server-side. """
+        product = get_object_or_404(Product.objects.only('id', 'last_price_update'), pk=product_id)
+        if not self.has_view_permission(request, product):
+            return HttpResponse(status=403)
+        return HttpResponse(get_price_chart_svg(product), content_type='image/svg+xml')
+
     def price_history_chart(self, obj):
-        """ Display a mini price history chart (can be upgraded later). """
-        dummy_url = (
-            f"https://quickchart.io/chart"
-            f"?c={{type:'line',data:{{labels:['Jan','Feb','Mar'],datasets:[{{label:'Price',data:[100,120,110]}}]}}}}"
-        )
-        return mark_safe(f'<img src="{dummy_url}" width="400">')
+        """ Price history chart rendered locally from the downsampled series. """
+        if obj is None or obj.pk is None:
+            return '-'
+        url = reverse('admin:products_product_price_chart', args=[obj.pk])
+        return format_html('<img src="{}" width="600" height="200" alt="Price history">', url)
     price_history_chart.short_description = "Price History Chart"
 
+    def full_price_history(self, obj):
+        """ Link to the complete, paginated history of the product. """
+        if obj is None or obj.pk is None:
+            return '-'
+        url = reverse('admin:products_productpricehistory_changelist')
+        return format_html('<a href="{}?product__id__exact={}">View all price history</a>', url, obj.pk)
+    full_price_history.short_description = "Full Price History"
+
     def trigger_update_prices(self, request, queryset):
         """ Admin action: trigger Celery price update. """
         update_product_prices.delay()
@@ -55,3 +122,11 @@ class ProductPriceHistoryAdmin(admin.ModelAdmin):
     search_fields = ('product__name',)
     ordering = ['-timestamp']
     date_hierarchy = 'timestamp'
+
+@admin.register(ProductPriceRollup)
+class ProductPriceRollupAdmin(admin.ModelAdmin):
+    list_display = ('product', 'granularity', 'bucket_start', 'last_price', 'change_percentage', 'units_sold', 'revenue', 'row_count')
+    list_filter = ('granularity',)
+    search_fields = ('product__name',)
+    ordering = ['-bucket_start']
+    date_hierarchy = 'bucket_start'
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from products.models import Product
+
+CURRENT_PRICES_VERSION_KEY = 'products:current_prices:version'
+
+
+def current_prices_version():
+    """Version of the current-price snapshot; bumped on every product write"""
+    version = cache.get(CURRENT_PRICES_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so ETags handed out before a cache flush never match again
+        cache.add(CURRENT_PRICES_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CURRENT_PRICES_VERSION_KEY)
+    return version
+
+
+def invalidate_current_prices():
+    try:
+        cache.incr(CURRENT_PRICES_VERSION_KEY)
+    except ValueError:
+        pass  # no snapshot yet, the next read seeds a fresh version
+
+
+def get_current_prices():
+    """(version, [{id, name, current_price}, ...]) served from the cache when possible"""
+    version = current_prices_version()
+    key = f'products:current_prices:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = list(Product.objects.order_by('id').values('id', 'name', 'current_price'))
+        cache.set(key, data, timeout=getattr(settings, 'CURRENT_PRICES_CACHE_TIMEOUT', 3600))
+    return version, data
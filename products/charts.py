@@ -0,0 +1,166 @@
+from html import escape
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDay, TruncHour
+from products.models import ProductPriceHistory, ProductPriceRollup
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most ``threshold`` points that keep the visual
+    shape of the series: the first and last points plus, for every bucket in
+    between, the point forming the largest triangle with its neighbours.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        areas = np.abs(
+            (x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        indices[i + 1] = a
+
+    return indices
+
+
+def _bucketed_prices(history, span_seconds, max_buckets):
+    """
+    (timestamps, prices) for raw history pre-aggregated in the database into
+    hourly buckets, or daily ones when the span holds more than
+    ``max_buckets`` hours. Each bucket contributes its low and high (between
+    its first and last row, ordered to end near its close) and its last
+    price, so spikes survive the later LTTB pass.
+    """
+    trunc = TruncHour if span_seconds / 3600 <= max_buckets else TruncDay
+    buckets = list(
+        history.annotate(bucket=trunc('timestamp')).values('bucket')
+        .annotate(low=Min('price'), high=Max('price'), first_at=Min('timestamp'), last_at=Max('timestamp'))
+        .order_by('bucket')
+    )
+
+    # Closing price of each bucket: the row at its last timestamp
+    closes = {}
+    last_ats = [bucket['last_at'] for bucket in buckets]
+    for offset in range(0, len(last_ats), 500):
+        closes.update(
+            history.filter(timestamp__in=last_ats[offset:offset + 500])
+            .order_by('timestamp', 'id').values_list('timestamp', 'price')
+        )
+
+    points = []
+    for bucket in buckets:
+        first, last = bucket['first_at'].timestamp(), bucket['last_at'].timestamp()
+        close = float(closes[bucket['last_at']])
+        low, high = float(bucket['low']), float(bucket['high'])
+        extremes = (low, high) if close >= (low + high) / 2 else (high, low)
+        points += [
+            (first + (last - first) / 3, extremes[0]),
+            (first + (last - first) * 2 / 3, extremes[1]),
+            (last, close),
+        ]
+    points = np.array(points, dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def price_series(product_id):
+    """
+    (timestamps in epoch seconds, prices) for a product, oldest first.
+    Daily rollups fill in the period whose raw rows were compacted away.
+
+    Up to PRICE_CHART_RAW_ROWS raw rows are read as they are; longer
+    histories are bucketed in the database first, so the rows loaded per
+    chart stay bounded however long the history grows.
+    """
+    history = ProductPriceHistory.objects.filter(product_id=product_id)
+    stats = history.aggregate(rows=Count('id'), first=Min('timestamp'), last=Max('timestamp'))
+
+    if stats['rows'] <= getattr(settings, 'PRICE_CHART_RAW_ROWS', 3000):
+        raw = list(history.order_by('timestamp').values_list('timestamp', 'price'))
+        timestamps = np.array([moment.timestamp() for moment, _ in raw], dtype=np.float64)
+        prices = np.array([price for _, price in raw], dtype=np.float64)
+    else:
+        timestamps, prices = _bucketed_prices(
+            history, (stats['last'] - stats['first']).total_seconds(),
+            getattr(settings, 'PRICE_CHART_MAX_BUCKETS', 2400)
+        )
+
+    rollups = ProductPriceRollup.objects.filter(product_id=product_id, granularity='day')
+    if stats['first'] is not None:
+        rollups = rollups.filter(bucket_start__lt=stats['first'])
+    older = list(rollups.order_by('bucket_start').values_list('bucket_start', 'last_price'))
+    if older:
+        timestamps = np.concatenate([[moment.timestamp() for moment, _ in older], timestamps])
+        prices = np.concatenate([[float(price) for _, price in older], prices])
+    return timestamps, prices
+
+
+def render_svg(timestamps, prices, width=600, height=200, padding=30):
+    """Standalone SVG line chart, no external assets"""
+    header = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">'
+        f'<rect width="{width}" height="{height}" fill="#fff"/>'
+    )
+    if len(prices) == 0:
+        return header + (
+            f'<text x="{width / 2}" y="{height / 2}" text-anchor="middle" fill="#666">'
+            'No price history yet</text></svg>'
+        )
+
+    t_min, t_max = timestamps.min(), timestamps.max()
+    p_min, p_max = prices.min(), prices.max()
+    t_span = (t_max - t_min) or 1.0
+    p_span = (p_max - p_min) or 1.0
+
+    xs = padding + (timestamps - t_min) / t_span * (width - 2 * padding)
+    ys = height - padding - (prices - p_min) / p_span * (height - 2 * padding)
+    points = ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs, ys))
+
+    start = np.datetime_as_string(np.datetime64(int(t_min), 's'), unit='D')
+    end = np.datetime_as_string(np.datetime64(int(t_max), 's'), unit='D')
+    return header + (
+        f'<polyline points="{points}" fill="none" stroke="#417690" stroke-width="1.5"/>'
+        f'<text x="4" y="{padding}" fill="#333">{p_max:.2f}</text>'
+        f'<text x="4" y="{height - padding}" fill="#333">{p_min:.2f}</text>'
+        f'<text x="{padding}" y="{height - 8}" fill="#666">{escape(start)}</text>'
+        f'<text x="{width - padding}" y="{height - 8}" text-anchor="end" fill="#666">{escape(end)}</text>'
+        f'<text x="{width - padding}" y="14" text-anchor="end" fill="#666">{len(prices)} points</text>'
+        '</svg>'
+    )
+
+
+def get_price_chart_svg(product, points=None):
+    """
+    Downsampled price chart for a product, cached until its price next changes
+    (the key includes ``last_price_update``).
+    """
+    points = points or getattr(settings, 'PRICE_CHART_POINTS', 300)
+    version = product.last_price_update.timestamp() if product.last_price_update else 0
+    key = f'products:price_chart:{product.pk}:{version}:{points}'
+    svg = cache.get(key)
+    if svg is None:
+        timestamps, prices = price_series(product.pk)
+        keep = lttb(timestamps, prices, points)
+        svg = render_svg(timestamps[keep], prices[keep])
+        cache.set(key, svg, timeout=getattr(settings, 'PRICE_CHART_CACHE_TIMEOUT', 3600))
+    return svg
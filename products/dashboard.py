@@ -0,0 +1,72 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Exists, ExpressionWrapper, F, FloatField, OuterRef, Q
+from django.db.models.functions import NullIf
+from django.utils import timezone
+from products.cache import current_prices_version
+from products.models import Product, ProductPriceHistory
+
+PRICE_DIFF_PERCENT = ExpressionWrapper(
+    (F('current_price') - F('base_price')) * 100.0 / NullIf(F('base_price'), 0),
+    output_field=FloatField()
+)
+
+
+def build_dashboard_summary():
+    """Admin dashboard metrics, aggregated in the database (3 queries)"""
+    from rl_pricing.models import TrainingSession
+
+    now = timezone.now()
+    # RL products without a successful training run in the last RL_MODEL_STALE_DAYS
+    stale_days = getattr(settings, 'RL_MODEL_STALE_DAYS', 7)
+    recently_trained = TrainingSession.objects.filter(
+        model__product=OuterRef('pk'),
+        successful=True,
+        completed_at__gte=now - timedelta(days=stale_days)
+    )
+    totals = Product.objects.aggregate(
+        product_count=Count('id'),
+        rl_count=Count('id', filter=Q(pricing_strategy='RL')),
+        static_count=Count('id', filter=Q(pricing_strategy='STATIC')),
+        avg_price_adjustment=Avg(PRICE_DIFF_PERCENT, filter=Q(base_price__gt=0)),
+        at_min_price=Count('id', filter=Q(current_price__lte=F('min_price'))),
+        at_max_price=Count('id', filter=Q(current_price__gte=F('max_price'))),
+        stale_model_count=Count('id', filter=Q(pricing_strategy='RL') & ~Q(Exists(recently_trained))),
+    )
+
+    recently_updated = list(
+        Product.objects
+        .annotate(price_diff_percent=PRICE_DIFF_PERCENT)
+        .order_by('-last_price_update')[:5]
+    )
+    for product in recently_updated:
+        if product.price_diff_percent is None:
+            product.price_diff_percent = 0
+
+    price_updates_24h = ProductPriceHistory.objects.filter(timestamp__gte=now - timedelta(hours=24)).count()
+
+    return {
+        'dynamic_pricing_count': totals['product_count'],
+        'avg_price_adjustment': totals['avg_price_adjustment'] or 0,
+        'recently_updated': recently_updated,
+        'strategy_split': {'RL': totals['rl_count'], 'STATIC': totals['static_count']},
+        'products_at_min_price': totals['at_min_price'],
+        'products_at_max_price': totals['at_max_price'],
+        'stale_model_count': totals['stale_model_count'],
+        'price_updates_24h': price_updates_24h,
+        'generated_at': now,
+    }
+
+
+def get_dashboard_summary():
+    """
+    Cached dashboard summary. The key follows the current-price version, so
+    any price update invalidates it; the short TTL covers model retraining.
+    """
+    key = f'products:dashboard:{current_prices_version()}'
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_dashboard_summary()
+        cache.set(key, summary, timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60))
+    return summary
@@ -0,0 +1,90 @@
+import csv
+import json
+from datetime import datetime, time
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import ProductPriceHistory
+
+EXPORT_FIELDS = ('id', 'product_id', 'price', 'change_percentage', 'units_sold', 'revenue', 'timestamp')
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def parse_export_time(value, end_of_day=False):
+    """ISO datetime or date (whole day) from a query param; raises ValueError"""
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is not None:
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f"Invalid date: {value}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_rows(product=None, category=None, since=None, until=None, chunk_size=None):
+    """
+    Lazily stream price history as tuples of EXPORT_FIELDS, oldest first.
+    Rows come through a server-side cursor, ``chunk_size`` at a time.
+    """
+    chunk_size = chunk_size or getattr(settings, 'PRICE_HISTORY_EXPORT_CHUNK_SIZE', 2000)
+    queryset = ProductPriceHistory.objects.order_by('timestamp', 'id')
+    if product:
+        queryset = queryset.filter(product_id=product)
+    if category:
+        queryset = queryset.filter(product__category_id=category)
+    if since:
+        queryset = queryset.filter(timestamp__gte=since)
+    if until:
+        queryset = queryset.filter(timestamp__lte=until)
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _format(row):
+    # Decimal and datetime columns are written as strings, like DRF does
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def _batched(lines, batch_size):
+    """Join lines into larger writes so the server is not flushing per row"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def ndjson_stream(rows, batch_size=500):
+    lines = (
+        json.dumps(dict(zip(EXPORT_FIELDS, _format(row))), default=str) + '\n'
+        for row in rows
+    )
+    return _batched(lines, batch_size)
+
+
+def csv_stream(rows, batch_size=500):
+    writer = csv.writer(Echo())
+    header = writer.writerow(EXPORT_FIELDS)
+    lines = (writer.writerow(_format(row)) for row in rows)
+    yield header
+    yield from _batched(lines, batch_size)
+
+
+# ?output= value -> (stream function, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_stream, 'text/csv', 'csv'),
+}
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from products.models import ProductPriceHistory, ProductSalesFeatures
+
+FEATURE_FIELDS = ['daily_buckets', 'sales_count_7d', 'units_sold_7d', 'revenue_7d', 'last_sale_at', 'updated_at']
+
+
+def rebuild_sales_features(product_ids):
+    """Recompute features for products from their price history (two queries)"""
+    product_ids = list(product_ids)
+    today = timezone.localdate()
+    window_start = timezone.now() - timedelta(days=ProductSalesFeatures.WINDOW_DAYS + 1)
+
+    features = {pid: ProductSalesFeatures(product_id=pid, daily_buckets={}) for pid in product_ids}
+
+    daily = (
+        ProductPriceHistory.objects
+        .filter(product_id__in=product_ids, timestamp__gte=window_start)
+        .order_by()
+        .annotate(day=TruncDate('timestamp'))
+        .values('product_id', 'day')
+        .annotate(rows=Count('id'), units=Sum('units_sold'), revenue=Sum('revenue'))
+    )
+    for row in daily:
+        features[row['product_id']].daily_buckets[row['day'].isoformat()] = [
+            row['rows'], row['units'] or 0, float(row['revenue'] or 0)
+        ]
+
+    last_sales = (
+        ProductPriceHistory.objects
+        .filter(product_id__in=product_ids)
+        .order_by()
+        .values('product_id')
+        .annotate(last=Max('timestamp'))
+    )
+    for row in last_sales:
+        features[row['product_id']].last_sale_at = row['last']
+
+    now = timezone.now()
+    for feature in features.values():
+        feature.roll(today)
+        feature.updated_at = now
+
+    ProductSalesFeatures.objects.bulk_create(
+        features.values(),
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=FEATURE_FIELDS,
+    )
+    return features
+
+
+def get_sales_features(product_ids):
+    """Features for many products in one query, rebuilding any that are missing"""
+    product_ids = list(product_ids)
+    today = timezone.localdate()
+    features = ProductSalesFeatures.objects.in_bulk(product_ids)
+    for feature in features.values():
+        feature.roll(today)
+
+    missing = [pid for pid in product_ids if pid not in features]
+    if missing:
+        features.update(rebuild_sales_features(missing))
+    return features
+
+
+def record_price_history(rows):
+    """
+    Fold newly written ProductPriceHistory rows into the feature table.
+
+    Called by the post_save signal for single rows and explicitly by bulk
+    writers, since ``bulk_create`` sends no signals.
+    """
+    by_product = defaultdict(list)
+    for row in rows:
+        by_product[row.product_id].append(row)
+    if not by_product:
+        return
+
+    today = timezone.localdate()
+    with transaction.atomic():
+        features = ProductSalesFeatures.objects.select_for_update().in_bulk(list(by_product))
+        missing = [pid for pid in by_product if pid not in features]
+
+        for product_id, feature in features.items():
+            for row in by_product[product_id]:
+                feature.add(row.timestamp, row.units_sold, row.revenue)
+            feature.roll(today)
+            feature.updated_at = timezone.now()
+        ProductSalesFeatures.objects.bulk_update(features.values(), FEATURE_FIELDS)
+
+        # The rows are already stored, so a rebuild picks them up
+        if missing:
+            rebuild_sales_features(missing)
+
+
+def state_sales_columns(feature, now=None):
+    """(days_since_last, sales_count) as the RL state sees them: 30 days when no sale this week"""
+    now = now or timezone.now()
+    if feature.sales_count_7d and feature.last_sale_at:
+        return float((now - feature.last_sale_at).days), float(feature.sales_count_7d)
+    return 30.0, 0.0
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import Product, ProductCategory, ProductPriceHistory
+from .rollups import compacted_history
+
+
+class BatchLoader:
+    """
+    Request-scoped, synchronous DataLoader.
+
+    graphene-django executes resolvers synchronously, so loads cannot be
+    deferred to the end of a tick. Instead, ids are queued up front with
+    ``enqueue`` (root resolvers know every product they return) and the
+    first ``load`` fetches everything queued in one query. Results are
+    cached for the rest of the request.
+    """
+
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self.cache = {}
+        self.queue = set()
+
+    def enqueue(self, keys):
+        self.queue.update(key for key in keys if key not in self.cache)
+
+    def prime(self, values):
+        """Seed the cache with already loaded ``{key: value}`` pairs"""
+        for key, value in values.items():
+            self.cache.setdefault(key, value)
+            self.queue.discard(key)
+
+    def load(self, key):
+        if key not in self.cache:
+            self.queue.add(key)
+            keys = list(self.queue)
+            self.queue.clear()
+            results = self.batch_load(keys)
+            for k in keys:
+                self.cache[k] = results.get(k, self.default)
+        return self.cache[key]
+
+
+def load_recent_price_history(product_ids):
+    """
+    Latest PRODUCT_HISTORY_LIMIT rows per product, one windowed query per
+    GRAPHQL_LOADER_CHUNK_SIZE products; products with fewer raw rows are
+    topped up from the daily rollups of their compacted history (one more
+    query per chunk).
+    """
+    limit = getattr(settings, 'PRODUCT_HISTORY_LIMIT', 10)
+    chunk_size = getattr(settings, 'GRAPHQL_LOADER_CHUNK_SIZE', 500)
+    product_ids = list(product_ids)
+    history = defaultdict(list)
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
+        rows = (
+            ProductPriceHistory.objects
+            .filter(product_id__in=chunk)
+            .annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('product_id'),
+                order_by=[F('timestamp').desc(), F('id').desc()]
+            ))
+            .filter(row_number__lte=limit)
+            .order_by('product_id', '-timestamp', '-id')
+        )
+        for row in rows:
+            history[row.product_id].append(row)
+
+        short = {product_id: limit - len(history[product_id]) for product_id in chunk}
+        for product_id, entries in compacted_history(short).items():
+            history[product_id].extend(entries)
+    return history
+
+
+def load_categories(category_ids):
+    return ProductCategory.objects.in_bulk(category_ids)
+
+
+def load_products(product_ids):
+    return Product.objects.in_bulk(product_ids)
+
+
+class Loaders:
+    def __init__(self):
+        self.price_history = BatchLoader(load_recent_price_history, default=[])
+        self.category = BatchLoader(load_categories)
+        self.product = BatchLoader(load_products)
+
+    def prime_products(self, products):
+        """Register products returned by a root field so their relations batch"""
+        products = list(products)
+        self.product.prime({product.id: product for product in products})
+        self.price_history.enqueue(product.id for product in products)
+        self.category.enqueue(product.category_id for product in products)
+        return products
+
+
+def get_loaders(info):
+    """Loaders bound to the current request (``info.context``)"""
+    loaders = getattr(info.context, 'pricing_loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        info.context.pricing_loaders = loaders
+    return loaders
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from products.rollups import build_price_rollups, compact_price_history
+
+class Command(BaseCommand):
+    help = 'Roll up price history into hourly/daily buckets and delete raw rows past the retention horizon.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Days of raw history to keep (defaults to PRICE_HISTORY_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--rollup-only',
+            action='store_true',
+            help='Only refresh the rollups, do not delete anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['rollup_only']:
+            rows = build_price_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rolled up {rows} price history rows."))
+            return
+
+        deleted = compact_price_history(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Compacted {deleted} price history rows."))
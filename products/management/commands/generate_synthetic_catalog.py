@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.synthetic import DEMAND_CURVES, generate_catalog
+
+class Command(BaseCommand):
+    help = 'Bulk-create a seeded synthetic catalog (categories, products and price history) for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=1000,
+            help='Number of products to create'
+        )
+        parser.add_argument(
+            '--history',
+            type=int,
+            default=100,
+            help='Price history rows per product'
+        )
+        parser.add_argument(
+            '--categories',
+            type=int,
+            default=10,
+            help='Number of categories the products are spread over'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Days of history, ending now'
+        )
+        parser.add_argument(
+            '--demand-curve',
+            choices=sorted(DEMAND_CURVES),
+            default='isoelastic',
+            help='How expected units sold respond to price relative to the base price'
+        )
+        parser.add_argument(
+            '--elasticity',
+            type=float,
+            default=1.5,
+            help='Mean price elasticity of demand (varies per product)'
+        )
+        parser.add_argument(
+            '--base-demand',
+            type=float,
+            default=5.0,
+            help='Mean units sold per history row at the base price'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same arguments always generate the same data'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Products (with their history) written per transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['products'] < 1 or options['categories'] < 1 or options['history'] < 0:
+            raise CommandError("--products and --categories must be positive, --history non-negative.")
+
+        report_every = max(options['products'] // 20, options['batch_size'])
+
+        def progress(products, rows):
+            if products % report_every < options['batch_size'] or products == options['products']:
+                self.stdout.write(f"⏳ {products}/{options['products']} products, {rows} history rows")
+
+        result = generate_catalog(
+            products=options['products'],
+            history_rows=options['history'],
+            categories=options['categories'],
+            days=options['days'],
+            demand_curve=options['demand_curve'],
+            elasticity=options['elasticity'],
+            base_demand=options['base_demand'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Created {result['categories']} categories, {result['products']} products and "
+            f"{result['rows']} history rows in {result['seconds']:.1f}s "
+            f"({result['rows'] / max(result['seconds'], 1e-9):.0f} rows/s)"
+        ))
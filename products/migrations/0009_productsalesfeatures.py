@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 14:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_remove_product_ab_group_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesFeatures',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_features', serialize=False, to='products.product')),
+                ('daily_buckets', models.JSONField(default=dict)),
+                ('sales_count_7d', models.PositiveIntegerField(default=0)),
+                ('units_sold_7d', models.PositiveIntegerField(default=0)),
+                ('revenue_7d', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('last_sale_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_productsalesfeatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('last_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('change_percentage', models.FloatField(default=0.0)),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productpricehistory',
+            index=models.Index(fields=['product', 'timestamp'], name='products_pr_product_49dc7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpricehistory',
+            index=models.Index(fields=['timestamp'], name='products_pr_timesta_0068ba_idx'),
+        ),
+        migrations.AddField(
+            model_name='productpricerollup',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rollups', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='productpricerollup',
+            index=models.Index(fields=['product', 'bucket_start'], name='products_pr_product_93280d_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productpricerollup',
+            constraint=models.UniqueConstraint(fields=('product', 'granularity', 'bucket_start'), name='unique_price_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_productpricerollup_and_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['last_price_update', 'id'], name='products_pr_last_pr_ce6d8e_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 14:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_last_price_update_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productpricehistory',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
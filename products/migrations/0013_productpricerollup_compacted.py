@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_productpricehistory_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productpricerollup',
+            name='compacted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from django.utils import timezone
 from django.db import models
 from django.core.validators import MinValueValidator
@@ -34,6 +35,12 @@ class Product(models.Model):
     )
     last_strategy_change = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for price delta sync (products.sync)
+            models.Index(fields=['last_price_update', 'id']),
+        ]
+
     def clean(self):
         if self.base_price < 0 or self.current_price < 0 or self.cost_price < 0:
             raise ValidationError("Price fields cannot be negative.")
@@ -54,7 +61,8 @@ class Product(models.Model):
 class ProductPriceHistory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Like auto_now_add, but bulk backfills and generators can set their own
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     change_percentage = models.FloatField(default=0.0) 
     
     units_sold = models.PositiveIntegerField(default=0)
@@ -62,6 +70,10 @@ class ProductPriceHistory(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['product', 'timestamp']),
+            models.Index(fields=['timestamp']),
+        ]
 
     def clean(self):
         if self.price < 0:
@@ -75,3 +87,75 @@ class ProductPriceHistory(models.Model):
     
     def __str__(self):
         return f"{self.product.name} - {self.price} at {self.timestamp}"
+
+class ProductPriceRollup(models.Model):
+    """
+    Hourly or daily aggregate of ProductPriceHistory rows. Rollups are kept
+    after raw rows older than the retention horizon are compacted away;
+    ``compacted`` marks buckets whose raw rows are gone.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    last_price = models.DecimalField(max_digits=10, decimal_places=2)
+    change_percentage = models.FloatField(default=0.0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    row_count = models.PositiveIntegerField(default=0)
+    compacted = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-bucket_start']
+        indexes = [
+            models.Index(fields=['product', 'bucket_start']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'granularity', 'bucket_start'], name='unique_price_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.last_price} ({self.granularity} of {self.bucket_start})"
+
+class ProductSalesFeatures(models.Model):
+    """
+    Rolling 7-day sales features for a product, kept up to date as price
+    history rows are written (see ``products.features``).
+
+    ``daily_buckets`` maps ISO dates to ``[rows, units_sold, revenue]``; the
+    rolling totals are re-derived from it at day granularity.
+    """
+    WINDOW_DAYS = 7
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='sales_features')
+    daily_buckets = models.JSONField(default=dict)
+    sales_count_7d = models.PositiveIntegerField(default=0)
+    units_sold_7d = models.PositiveIntegerField(default=0)
+    revenue_7d = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    last_sale_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def add(self, timestamp, units_sold=0, revenue=0):
+        day = timezone.localdate(timestamp).isoformat()
+        bucket = self.daily_buckets.setdefault(day, [0, 0, 0.0])
+        bucket[0] += 1
+        bucket[1] += int(units_sold)
+        bucket[2] += float(revenue)
+        if self.last_sale_at is None or timestamp > self.last_sale_at:
+            self.last_sale_at = timestamp
+
+    def roll(self, today=None):
+        """Drop buckets that left the window (today and the 6 days before) and refresh the rolling totals"""
+        today = today or timezone.localdate()
+        start = (today - timedelta(days=self.WINDOW_DAYS - 1)).isoformat()
+        self.daily_buckets = {day: bucket for day, bucket in self.daily_buckets.items() if day >= start}
+        self.sales_count_7d = sum(bucket[0] for bucket in self.daily_buckets.values())
+        self.units_sold_7d = sum(bucket[1] for bucket in self.daily_buckets.values())
+        self.revenue_7d = round(sum(bucket[2] for bucket in self.daily_buckets.values()), 2)
+
+    def __str__(self):
+        return f"{self.product.name} - {self.sales_count_7d} sales in 7 days"
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    """Keyset pagination over the primary key, stable while products change"""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class PriceHistoryCursorPagination(CursorPagination):
+    """Newest history first, served by the timestamp index"""
+    ordering = ('-timestamp', '-id')
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
@@ -0,0 +1,55 @@
+import time
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from products.cache import invalidate_current_prices
+from products.features import record_price_history
+from products.models import Product, ProductPriceHistory
+
+PriceDecision = namedtuple('PriceDecision', ['product_id', 'new_price', 'change_percentage'])
+
+
+def apply_price_decisions(decisions, batch_size=1000):
+    """
+    Persist computed price decisions in bulk.
+
+    Each batch updates only ``current_price`` and ``last_price_update`` with
+    one ``bulk_update``, inserts its history rows with one ``bulk_create`` and
+    runs in a single transaction. Returns write statistics.
+    """
+    decisions = list(decisions)
+    started = time.perf_counter()
+    rows = 0
+
+    for start in range(0, len(decisions), batch_size):
+        batch = decisions[start:start + batch_size]
+        now = timezone.now()
+        products = []
+        history = []
+        for decision in batch:
+            price = Decimal(str(round(float(decision.new_price), 2)))
+            products.append(Product(id=decision.product_id, current_price=price, last_price_update=now))
+            history.append(ProductPriceHistory(
+                product_id=decision.product_id,
+                price=price,
+                change_percentage=float(decision.change_percentage),
+            ))
+
+        with transaction.atomic():
+            Product.objects.bulk_update(products, ['current_price', 'last_price_update'])
+            ProductPriceHistory.objects.bulk_create(history)
+            record_price_history(history)
+        rows += len(products) + len(history)
+
+    # bulk_update sends no post_save, so invalidate the price snapshot here
+    if decisions:
+        invalidate_current_prices()
+
+    seconds = time.perf_counter() - started
+    return {
+        'products': len(decisions),
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,208 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from products.models import ProductPriceHistory, ProductPriceRollup, ProductSalesFeatures
+
+ROLLUP_FIELDS = ['last_price', 'change_percentage', 'units_sold', 'revenue', 'row_count']
+
+
+def _bucket_starts(timestamp):
+    hour = timestamp.replace(minute=0, second=0, microsecond=0)
+    return (('hour', hour), ('day', hour.replace(hour=0)))
+
+
+def _add_row(buckets, product_id, timestamp, price, change_percentage, units_sold, revenue):
+    for granularity, bucket_start in _bucket_starts(timestamp):
+        bucket = buckets.setdefault((product_id, granularity, bucket_start), {
+            'last_price': price,
+            'growth': 1.0,
+            'units_sold': 0,
+            'revenue': Decimal('0'),
+            'row_count': 0,
+        })
+        bucket['last_price'] = price
+        bucket['growth'] *= 1 + change_percentage / 100
+        bucket['units_sold'] += units_sold
+        bucket['revenue'] += revenue
+        bucket['row_count'] += 1
+
+
+def _save_buckets(buckets, compacted=False):
+    ProductPriceRollup.objects.bulk_create(
+        [
+            ProductPriceRollup(
+                product_id=product_id,
+                granularity=granularity,
+                bucket_start=bucket_start,
+                last_price=bucket['last_price'],
+                change_percentage=round((bucket['growth'] - 1) * 100, 4),
+                units_sold=bucket['units_sold'],
+                revenue=bucket['revenue'],
+                row_count=bucket['row_count'],
+                compacted=compacted,
+            )
+            for (product_id, granularity, bucket_start), bucket in buckets.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['product', 'granularity', 'bucket_start'],
+        update_fields=ROLLUP_FIELDS + ['compacted'],
+    )
+
+
+def _fold_compacted(buckets):
+    """
+    Add compacted rollups into the matching freshly aggregated buckets: their
+    raw rows are gone, so the new rows (backfills) extend them instead of
+    replacing them. The compacted bucket keeps its last price, as the order of
+    the deleted rows against the backfilled ones is unknown.
+    """
+    existing = ProductPriceRollup.objects.filter(
+        compacted=True,
+        product_id__in={product_id for product_id, _, _ in buckets},
+        bucket_start__gte=min(bucket_start for _, _, bucket_start in buckets),
+        bucket_start__lte=max(bucket_start for _, _, bucket_start in buckets),
+    )
+    for rollup in existing:
+        bucket = buckets.get((rollup.product_id, rollup.granularity, rollup.bucket_start))
+        if bucket is None:
+            continue
+        bucket['last_price'] = rollup.last_price
+        bucket['growth'] *= 1 + rollup.change_percentage / 100
+        bucket['units_sold'] += rollup.units_sold
+        bucket['revenue'] += rollup.revenue
+        bucket['row_count'] += rollup.row_count
+
+
+def compaction_horizon():
+    """End of the newest compacted day: raw rows before it are backfills not yet rolled up"""
+    last = ProductPriceRollup.objects.filter(granularity='day', compacted=True).aggregate(
+        last=Max('bucket_start')
+    )['last']
+    return last + timedelta(days=1) if last is not None else None
+
+
+def build_price_rollups(since=None, until=None, chunk_size=5000):
+    """
+    Aggregate raw price history into hourly and daily rollups.
+
+    Buckets are always recomputed whole, so by default the run restarts at
+    the most recent daily bucket (which may have been partial). Compacted
+    days are never recomputed; rows backfilled into them are folded in by
+    ``compact_price_history``. Rows are streamed in product order and
+    flushed product by product, keeping memory bounded. Returns the number
+    of raw rows read.
+    """
+    if since is None:
+        since = ProductPriceRollup.objects.filter(granularity='day').aggregate(last=Max('bucket_start'))['last']
+    horizon = compaction_horizon()
+    if horizon is not None and (since is None or since < horizon):
+        since = horizon
+
+    rows = ProductPriceHistory.objects.order_by('product_id', 'timestamp', 'id')
+    if since is not None:
+        rows = rows.filter(timestamp__gte=since)
+    if until is not None:
+        rows = rows.filter(timestamp__lt=until)
+
+    buckets = {}
+    current_product = None
+    read = 0
+    for row in rows.values_list(
+        'product_id', 'timestamp', 'price', 'change_percentage', 'units_sold', 'revenue'
+    ).iterator(chunk_size=chunk_size):
+        if row[0] != current_product and len(buckets) >= chunk_size:
+            _save_buckets(buckets)
+            buckets = {}
+        current_product = row[0]
+        read += 1
+        _add_row(buckets, *row)
+
+    if buckets:
+        _save_buckets(buckets)
+    return read
+
+
+def compact_price_history(retention_days=None, batch_size=10000, products_per_batch=100):
+    """
+    Delete raw history rows older than the retention horizon once they are
+    rolled up. The horizon is day-aligned and never shorter than the RL
+    state window, so sales features can always be rebuilt from raw rows.
+
+    Every raw row before the horizon is aggregated here, whether or not a
+    rollup run saw it (backfills land behind the rollup watermark), and its
+    buckets are marked compacted in the same transaction that deletes it.
+    Works through ``products_per_batch`` products at a time, deleting in
+    batches of ``batch_size`` rows. Returns the number of rows deleted.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'PRICE_HISTORY_RETENTION_DAYS', 90)
+    retention_days = max(retention_days, ProductSalesFeatures.WINDOW_DAYS + 1)
+    cutoff = (timezone.now() - timedelta(days=retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    build_price_rollups()
+
+    deleted = 0
+    old_rows = ProductPriceHistory.objects.filter(timestamp__lt=cutoff)
+    product_ids = list(old_rows.order_by('product_id').values_list('product_id', flat=True).distinct())
+    for start in range(0, len(product_ids), products_per_batch):
+        with transaction.atomic():
+            buckets = {}
+            ids = []
+            for row_id, *row in old_rows.filter(
+                product_id__in=product_ids[start:start + products_per_batch]
+            ).order_by('product_id', 'timestamp', 'id').values_list(
+                'id', 'product_id', 'timestamp', 'price', 'change_percentage', 'units_sold', 'revenue'
+            ):
+                ids.append(row_id)
+                _add_row(buckets, *row)
+            if not buckets:
+                continue
+            _fold_compacted(buckets)
+            _save_buckets(buckets, compacted=True)
+            for offset in range(0, len(ids), batch_size):
+                deleted += ProductPriceHistory.objects.filter(id__in=ids[offset:offset + batch_size]).delete()[0]
+    return deleted
+
+
+def compacted_history(needed):
+    """
+    Daily rollups of compacted periods standing in for raw history, for
+    readers that list a product's latest entries. ``needed`` maps product ids
+    to how many entries each is short of; returns product id to unsaved
+    ProductPriceHistory rows, newest first, marked ``rolled_up``.
+    """
+    needed = {product_id: count for product_id, count in needed.items() if count > 0}
+    if not needed:
+        return {}
+    rows = (
+        ProductPriceRollup.objects
+        .filter(product_id__in=needed, granularity='day', compacted=True)
+        .annotate(row_number=Window(
+            RowNumber(),
+            partition_by=F('product_id'),
+            order_by=F('bucket_start').desc()
+        ))
+        .filter(row_number__lte=max(needed.values()))
+        .order_by('product_id', '-bucket_start')
+    )
+    history = defaultdict(list)
+    for rollup in rows:
+        if len(history[rollup.product_id]) >= needed[rollup.product_id]:
+            continue
+        entry = ProductPriceHistory(
+            product_id=rollup.product_id,
+            price=rollup.last_price,
+            timestamp=rollup.bucket_start,
+            change_percentage=rollup.change_percentage,
+            units_sold=rollup.units_sold,
+            revenue=rollup.revenue,
+        )
+        entry.rolled_up = True
+        history[rollup.product_id].append(entry)
+    return history
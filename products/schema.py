@@ -1,6 +1,8 @@
 import graphene
 from graphene_django import DjangoObjectType
-from .models import Product, ProductCategory, ProductPriceHistory
+from .models import Product, ProductCategory, ProductPriceHistory, ProductPriceRollup
+from .loaders import get_loaders
+from .sync import changed_since
 
 class ProductCategoryType(DjangoObjectType):
     class Meta:
@@ -12,29 +14,76 @@ class ProductPriceHistoryType(DjangoObjectType):
         model = ProductPriceHistory
         fields = "__all__"
 
+    # Entries standing in for compacted history come from daily rollups and have no id
+    id = graphene.ID()
+    rolled_up = graphene.Boolean()
+
+    def resolve_rolled_up(self, info):
+        return getattr(self, 'rolled_up', False)
+
+    def resolve_product(self, info):
+        return get_loaders(info).product.load(self.product_id)
+
+class ProductPriceRollupType(DjangoObjectType):
+    class Meta:
+        model = ProductPriceRollup
+        fields = "__all__"
+
 class ProductType(DjangoObjectType):
     class Meta:
         model = Product
         fields = "__all__"
     
     price_history = graphene.List(ProductPriceHistoryType)
+    price_rollups = graphene.List(
+        ProductPriceRollupType,
+        granularity=graphene.String(default_value='day'),
+        limit=graphene.Int(default_value=30)
+    )
     
+    def resolve_category(self, info):
+        return get_loaders(info).category.load(self.category_id)
+
     def resolve_price_history(self, info):
-        return self.price_history.all().order_by('-timestamp')[:10]  # Last 10 price changes
+        # Last PRODUCT_HISTORY_LIMIT price changes, batched across the query;
+        # daily rollups fill in once older raw rows have been compacted
+        return get_loaders(info).price_history.load(self.id)
+    
+    def resolve_price_rollups(self, info, granularity, limit):
+        # Aggregated history, still available once raw rows have been compacted
+        return self.price_rollups.filter(granularity=granularity).order_by('-bucket_start')[:min(limit, 366)]
     
     
 
 
+class PriceChangesType(graphene.ObjectType):
+    products = graphene.List(ProductType)
+    next_cursor = graphene.String()
+    has_more = graphene.Boolean()
+
+
 class Query(graphene.ObjectType):
     all_products = graphene.List(ProductType)
+    price_changes = graphene.Field(
+        PriceChangesType,
+        cursor=graphene.String(),
+        limit=graphene.Int(default_value=500)
+    )
     product = graphene.Field(ProductType, id=graphene.Int(required=True))
     products_by_category = graphene.List(ProductType, category_id=graphene.Int(required=True))
     
     def resolve_all_products(self, info):
-        return Product.objects.all()
+        return get_loaders(info).prime_products(Product.objects.all())
+    
+    def resolve_price_changes(self, info, limit, cursor=None):
+        products, next_cursor, has_more = changed_since(Product.objects.all(), cursor=cursor, limit=limit)
+        get_loaders(info).prime_products(products)
+        return PriceChangesType(products=products, next_cursor=next_cursor, has_more=has_more)
     
     def resolve_product(self, info, id):
-        return Product.objects.get(id=id)
+        product = Product.objects.get(id=id)
+        get_loaders(info).prime_products([product])
+        return product
     
     def resolve_products_by_category(self, info, category_id):
-        return Product.objects.filter(category_id=category_id)
\ No newline at end of file
+        return get_loaders(info).prime_products(Product.objects.filter(category_id=category_id))
@@ -1,4 +1,5 @@
 #TODO add serializers for products
+from django.conf import settings
 from rest_framework import serializers
 from products.models import Product, ProductCategory, ProductPriceHistory
 
@@ -30,11 +31,28 @@ class ProductPriceHistorySerializer(serializers.ModelSerializer):
         return attrs
 
 class ProductSerializer(serializers.ModelSerializer):
-    price_history = ProductPriceHistorySerializer(many=True, read_only=True)
+    price_history = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = '__all__'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_history', True):
+            fields.pop('price_history')
+        return fields
+
+    def get_price_history(self, obj):
+        """
+        Latest PRODUCT_HISTORY_LIMIT entries, from the view's prefetch when
+        available (see ProductViewSet.get_queryset).
+        """
+        history = getattr(obj, 'recent_price_history', None)
+        if history is None:
+            limit = getattr(settings, 'PRODUCT_HISTORY_LIMIT', 10)
+            history = obj.price_history.order_by('-timestamp', '-id')[:limit]
+        return ProductPriceHistorySerializer(history, many=True).data
     
     def validate(self, attrs):
         """
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from products.cache import invalidate_current_prices
+from products.features import record_price_history
+from products.models import Product, ProductPriceHistory
+
+
+@receiver(post_save, sender=ProductPriceHistory)
+def update_sales_features(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_price_history([instance])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_price_snapshot(sender, **kwargs):
+    invalidate_current_prices()
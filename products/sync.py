@@ -0,0 +1,64 @@
+import base64
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_price_update, product_id):
+    raw = f"{last_price_update.isoformat()}|{product_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(last_price_update, product_id) from a cursor; raises ValueError when malformed"""
+    try:
+        timestamp, product_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(product_id)
+    except (TypeError, ValueError, base64.binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _position(row):
+    if isinstance(row, dict):
+        return row['last_price_update'], row['id']
+    return row.last_price_update, row.id
+
+
+def changed_since(queryset, cursor=None, limit=500):
+    """
+    Keyset page of products updated after ``cursor``, ordered by
+    (last_price_update, id) and served by the matching index.
+
+    ``last_price_update`` is ``auto_now``, so any save of a product (a stock
+    or name edit as well as a price change) moves it into the feed; clients
+    get a superset of price changes and should compare prices themselves.
+
+    The timestamp is taken when the row is saved, not when its transaction
+    commits, so a slow transaction can commit a row behind a cursor that was
+    already handed out. Rows newer than PRICE_CHANGES_CURSOR_LAG_SECONDS are
+    therefore held back until they are that old; a transaction that stays
+    open longer than the lag can still be missed.
+
+    Returns (rows, next_cursor, has_more). Pass ``next_cursor`` back to resume;
+    it stays unchanged when nothing new was found.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    lag = getattr(settings, 'PRICE_CHANGES_CURSOR_LAG_SECONDS', 30)
+    queryset = queryset.filter(last_price_update__lte=timezone.now() - timedelta(seconds=lag))
+    queryset = queryset.order_by('last_price_update', 'id')
+    if cursor:
+        timestamp, product_id = decode_cursor(cursor)
+        # The redundant __gte lets the database seek the index instead of scanning it
+        queryset = queryset.filter(
+            Q(last_price_update__gte=timestamp),
+            Q(last_price_update__gt=timestamp) | Q(id__gt=product_id)
+        )
+
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*_position(rows[-1])) if rows else cursor
+    return rows, next_cursor, has_more
@@ -0,0 +1,201 @@
+"""
+Seeded synthetic catalogs for load and performance testing.
+
+``generate_catalog`` bulk-creates categories, products with consistent
+prices (cost < min <= current <= max) and, per product, a price history
+that random-walks between the price bounds. Units sold follow a demand
+curve of the price relative to the base price, with Poisson noise, and
+revenue is units times price. All randomness comes from one seeded
+generator, so the same arguments always produce the same data.
+"""
+import time
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from products.cache import invalidate_current_prices
+from products.features import rebuild_sales_features
+from products.models import Product, ProductCategory, ProductPriceHistory
+
+# Price moves of the random walk, in percent (the same steps the RL agent takes)
+CHANGE_STEPS = np.array([-10.0, -5.0, 0.0, 5.0, 10.0])
+
+
+def linear_demand(ratio, elasticity):
+    return np.maximum(1 - elasticity * (ratio - 1), 0)
+
+
+def exponential_demand(ratio, elasticity):
+    return np.exp(-elasticity * (ratio - 1))
+
+
+def isoelastic_demand(ratio, elasticity):
+    return ratio ** -elasticity
+
+
+# Expected demand multiplier for price / base_price
+DEMAND_CURVES = {
+    'linear': linear_demand,
+    'exponential': exponential_demand,
+    'isoelastic': isoelastic_demand,
+}
+
+
+def _product_prices(rng, count, price_range):
+    low, high = price_range
+    base = np.round(np.exp(rng.uniform(np.log(low), np.log(high), count)), 2)
+    cost = np.round(base * rng.uniform(0.4, 0.8, count), 2)
+    min_price = np.round(np.maximum(cost * 1.05, base * 0.7), 2)
+    max_price = np.round(base * 1.5, 2)
+    return base, cost, min_price, max_price
+
+
+def _price_walks(rng, start, min_price, max_price, steps):
+    """(products, steps) prices and the percentage change that led to each"""
+    prices = np.empty((len(start), steps))
+    changes = rng.choice(CHANGE_STEPS, size=(len(start), steps), p=[0.1, 0.2, 0.4, 0.2, 0.1])
+    price = start
+    for step in range(steps):
+        new_price = np.round(np.clip(price * (1 + changes[:, step] / 100), min_price, max_price), 2)
+        changes[:, step] = (new_price - price) / price * 100
+        prices[:, step] = price = new_price
+    return prices, changes
+
+
+@contextmanager
+def _fast_sqlite_writes():
+    """Trade durability for speed while generating: a crash only loses the synthetic data"""
+    # The setting cannot change inside a transaction
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+def _insert_history(product_ids, prices, timestamps, changes, units, revenue):
+    """
+    Insert history rows given as parallel arrays (``timestamps`` as UTC
+    datetime64). SQLite gets one executemany with values formatted in NumPy,
+    several times faster than preparing a model instance per row; other
+    backends go through bulk_create.
+    """
+    if connection.vendor != 'sqlite':
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(
+                product_id=product_id, price=Decimal(f'{price:.2f}'),
+                timestamp=timestamp.replace(tzinfo=dt_timezone.utc), change_percentage=change,
+                units_sold=sold, revenue=Decimal(f'{earned:.2f}')
+            )
+            for product_id, price, timestamp, change, sold, earned in zip(
+                product_ids.tolist(), prices.tolist(), timestamps.astype(object),
+                changes.tolist(), units.tolist(), revenue.tolist()
+            )
+        ], batch_size=5000)
+        return
+
+    meta = ProductPriceHistory._meta
+    columns = ['product', 'price', 'timestamp', 'change_percentage', 'units_sold', 'revenue']
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(meta.db_table),
+        ', '.join(connection.ops.quote_name(meta.get_field(name).column) for name in columns),
+        ', '.join(['%s'] * len(columns))
+    )
+    # Same text format Django stores datetimes in on SQLite
+    stamps = np.char.replace(np.datetime_as_string(timestamps, unit='us'), 'T', ' ')
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, list(zip(
+            product_ids.tolist(), prices.tolist(), stamps.tolist(),
+            changes.tolist(), units.tolist(), revenue.tolist()
+        )))
+
+
+def generate_catalog(products=1000, history_rows=100, categories=10, days=90, demand_curve='isoelastic',
+                     elasticity=1.5, base_demand=5.0, price_range=(5.0, 500.0), seed=0,
+                     batch_size=1000, progress=None):
+    """
+    Create ``products`` products spread over ``categories`` new categories,
+    each with ``history_rows`` price history rows spaced over the last
+    ``days`` days. Products are written ``batch_size`` at a time, each batch
+    with its history in one transaction. ``elasticity`` is the mean price
+    elasticity (products vary around it) and ``base_demand`` the mean units
+    sold per row at the base price.
+
+    Sales features are rebuilt for the new products and the current-price
+    cache is invalidated. ``progress`` is called with (products done, rows
+    done). Returns a summary dict including the new product ids.
+    """
+    curve = DEMAND_CURVES[demand_curve]
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    now = np.datetime64(timezone.now().replace(tzinfo=None), 'us')  # UTC
+    interval = timedelta(days=days) / max(history_rows, 1)
+
+    with _fast_sqlite_writes():
+        run = ProductCategory.objects.count()
+        new_categories = ProductCategory.objects.bulk_create([
+            ProductCategory(name=f'Synthetic {run + i}') for i in range(categories)
+        ])
+        category_ids = np.array([category.pk for category in new_categories])
+
+        product_ids = []
+        rows = 0
+        for offset in range(0, products, batch_size):
+            count = min(batch_size, products - offset)
+            base, cost, min_price, max_price = _product_prices(rng, count, price_range)
+            elasticities = np.clip(rng.normal(elasticity, elasticity * 0.25, count), 0.1, None)
+            demand_scale = base_demand * rng.lognormal(0, 0.5, count)
+            start = np.round(np.clip(base * rng.uniform(0.9, 1.1, count), min_price, max_price), 2)
+            prices, changes = _price_walks(rng, start, min_price, max_price, history_rows)
+
+            expected = demand_scale[:, None] * curve(prices / base[:, None], elasticities[:, None])
+            units = rng.poisson(expected)
+            revenue = np.round(units * prices, 2)
+            # Evenly spaced rows ending now, jittered within their slot
+            slots = history_rows - np.arange(history_rows) - rng.uniform(0, 1, (count, history_rows))
+            ages = (slots * interval.total_seconds() * 1e6).astype('timedelta64[us]')
+            stock = rng.integers(0, 1000, count)
+            current = prices[:, -1] if history_rows else start
+
+            with transaction.atomic():
+                batch = Product.objects.bulk_create([
+                    Product(
+                        name=f'Synthetic product {offset + i}',
+                        category_id=int(category_ids[(offset + i) % len(category_ids)]),
+                        base_price=Decimal(f'{base[i]:.2f}'),
+                        cost_price=Decimal(f'{cost[i]:.2f}'),
+                        current_price=Decimal(f'{current[i]:.2f}'),
+                        min_price=Decimal(f'{min_price[i]:.2f}'),
+                        max_price=Decimal(f'{max_price[i]:.2f}'),
+                        stock_quantity=int(stock[i]),
+                    )
+                    for i in range(count)
+                ])
+                ids = [product.pk for product in batch]
+                _insert_history(
+                    np.repeat(ids, history_rows), prices.ravel(), now - ages.ravel(),
+                    changes.ravel(), units.ravel(), revenue.ravel()
+                )
+                rebuild_sales_features(ids)
+
+            product_ids += ids
+            rows += count * history_rows
+            if progress:
+                progress(len(product_ids), rows)
+
+    invalidate_current_prices()
+    return {
+        'categories': len(new_categories),
+        'products': len(product_ids),
+        'rows': rows,
+        'seconds': time.perf_counter() - started,
+        'product_ids': product_ids,
+    }
@@ -0,0 +1,20 @@
+from celery import shared_task
+from products import rollups
+
+
+@shared_task
+def rollup_price_history():
+    """
+    Refresh hourly and daily price history rollups.
+    """
+    rows = rollups.build_price_rollups()
+    return f"✅ Rolled up {rows} price history rows."
+
+
+@shared_task
+def compact_price_history(retention_days=None):
+    """
+    Roll up and delete raw price history older than the retention horizon.
+    """
+    deleted = rollups.compact_price_history(retention_days)
+    return f"✅ Compacted {deleted} price history rows."
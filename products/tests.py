@@ -1,3 +1,314 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.db.models import Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from products.charts import price_series
+from products.dashboard import build_dashboard_summary
+from products.loaders import load_recent_price_history
+from products.models import Product, ProductCategory, ProductPriceHistory, ProductPriceRollup, ProductSalesFeatures
+from products.rollups import build_price_rollups, compact_price_history
+from products.sync import changed_since, decode_cursor, encode_cursor
+from products.synthetic import generate_catalog
 
-# Create your tests here.
+
+class SyntheticCatalogTests(TestCase):
+    def test_generates_consistent_seeded_catalog(self):
+        result = generate_catalog(products=30, history_rows=20, categories=3, batch_size=8, seed=7)
+
+        self.assertEqual(result['products'], 30)
+        self.assertEqual(ProductPriceHistory.objects.count(), 600)
+        self.assertEqual(ProductSalesFeatures.objects.count(), 30)
+        for product in Product.objects.all():
+            self.assertLess(product.cost_price, product.min_price)
+            self.assertLessEqual(product.min_price, product.current_price)
+            self.assertLessEqual(product.current_price, product.max_price)
+            latest = product.price_history.order_by('-timestamp').first()
+            self.assertEqual(latest.price, product.current_price)
+
+        first = list(ProductPriceHistory.objects.order_by('id').values_list('price', 'units_sold', 'revenue'))
+        ProductPriceHistory.objects.all().delete()
+        Product.objects.all().delete()
+        generate_catalog(products=30, history_rows=20, categories=3, batch_size=8, seed=7)
+        second = list(ProductPriceHistory.objects.order_by('id').values_list('price', 'units_sold', 'revenue'))
+        self.assertEqual(first, second)
+
+
+class SalesFeaturesWindowTests(SimpleTestCase):
+    def test_window_covers_exactly_seven_days(self):
+        today = timezone.localdate()
+        features = ProductSalesFeatures(daily_buckets={
+            (today - timedelta(days=days_ago)).isoformat(): [1, days_ago, 10.0] for days_ago in range(9)
+        })
+
+        features.roll(today)
+
+        self.assertEqual(
+            sorted(features.daily_buckets), sorted((today - timedelta(days=d)).isoformat() for d in range(7))
+        )
+        self.assertEqual(features.sales_count_7d, 7)
+        self.assertEqual(features.units_sold_7d, sum(range(7)))
+        self.assertEqual(features.revenue_7d, 70.0)
+
+
+class PriceHistoryCompactionTests(TestCase):
+    def setUp(self):
+        category = ProductCategory.objects.create(name='Test')
+        self.product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100,
+            cost_price=60, stock_quantity=10, min_price=70, max_price=150
+        )
+        self.now = timezone.now()
+
+    def add_rows(self, days_ago, count=1):
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(
+                product=self.product, price=100, timestamp=self.now - timedelta(days=days_ago, minutes=i),
+                change_percentage=5.0, units_sold=2, revenue=200
+            )
+            for i in range(count)
+        ])
+
+    def daily_units(self):
+        return ProductPriceRollup.objects.filter(granularity='day').aggregate(units=Sum('units_sold'))['units']
+
+    def test_backfilled_rows_are_rolled_up_before_deletion(self):
+        for days_ago in (40, 30, 20, 1):
+            self.add_rows(days_ago, count=3)
+        build_price_rollups()
+
+        self.assertEqual(compact_price_history(retention_days=10), 9)
+        self.assertEqual(self.daily_units(), 24)
+
+        # Backfill into a compacted day and into days before the rollup watermark
+        self.add_rows(40, count=2)
+        self.add_rows(60)
+        self.add_rows(5)
+        build_price_rollups()
+        self.assertEqual(compact_price_history(retention_days=10), 3)
+
+        # The row 5 days back is still within retention: kept raw, rolled up once compacted
+        self.assertEqual(self.daily_units(), 30)
+        backfilled = ProductPriceRollup.objects.get(
+            granularity='day', bucket_start=(self.now - timedelta(days=40)).replace(hour=0, minute=0, second=0, microsecond=0)
+        )
+        self.assertEqual(backfilled.row_count, 5)
+        self.assertTrue(backfilled.compacted)
+        self.assertEqual(ProductPriceHistory.objects.count(), 4)
+
+    def test_recent_history_falls_back_to_compacted_rollups(self):
+        for days_ago in (40, 30, 20):
+            self.add_rows(days_ago)
+        self.add_rows(1, count=2)
+        compact_price_history(retention_days=10)
+
+        entries = load_recent_price_history([self.product.id])[self.product.id]
+        self.assertEqual([getattr(entry, 'rolled_up', False) for entry in entries], [False, False, True, True, True])
+        self.assertEqual(entries[2].timestamp.date(), (self.now - timedelta(days=20)).date())
+
+
+class PriceSeriesTests(TestCase):
+    @override_settings(PRICE_CHART_RAW_ROWS=10)
+    def test_long_history_is_bucketed_in_the_database(self):
+        category = ProductCategory.objects.create(name='Test')
+        product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100,
+            cost_price=60, stock_quantity=10, min_price=70, max_price=150
+        )
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=5)
+        # Six hours of rows every 5 minutes, with one spike and one dip
+        prices = [100 + (i % 12) for i in range(72)]
+        prices[20], prices[50] = 149, 71
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(product=product, price=price, timestamp=start + timedelta(minutes=5 * i))
+            for i, price in enumerate(prices)
+        ])
+
+        timestamps, series = price_series(product.id)
+
+        self.assertEqual(len(series), 6 * 3)
+        self.assertTrue((timestamps[1:] >= timestamps[:-1]).all())
+        self.assertEqual(series.max(), 149)
+        self.assertEqual(series.min(), 71)
+        self.assertEqual(series[-1], prices[-1])
+
+
+class GraphQLBatchingTests(TestCase):
+    QUERY = '{ allProducts { name category { name } priceHistory { price timestamp } } }'
+
+    def add_products(self, count):
+        categories = [ProductCategory.objects.create(name=f'Category {ProductCategory.objects.count()}') for _ in range(3)]
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'Widget {Product.objects.count()}', category=categories[i % 3], base_price=100,
+                current_price=100, cost_price=60, stock_quantity=10, min_price=70, max_price=150
+            )
+            ProductPriceHistory.objects.bulk_create([
+                ProductPriceHistory(product=product, price=100 + j) for j in range(3)
+            ])
+
+    def execute(self):
+        from pricing_api.schema import schema
+
+        result = schema.execute(self.QUERY, context_value=RequestFactory().post('/graphql/'))
+        self.assertIsNone(result.errors)
+        return result.data['allProducts']
+
+    def test_nested_relations_use_a_constant_number_of_queries(self):
+        # Products, their price history, compacted-rollup fallback and categories
+        self.add_products(1)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.execute()), 1)
+
+        self.add_products(40)
+        with self.assertNumQueries(4):
+            products = self.execute()
+        self.assertEqual(len(products), 41)
+        self.assertTrue(all(product['category']['name'] and len(product['priceHistory']) == 3 for product in products))
+
+    @override_settings(GRAPHQL_LOADER_CHUNK_SIZE=4)
+    def test_history_ids_are_chunked(self):
+        self.add_products(10)
+        ids = list(Product.objects.values_list('id', flat=True))
+
+        # Three chunks, each a history query plus its rollup fallback
+        with self.assertNumQueries(6):
+            history = load_recent_price_history(ids)
+        self.assertEqual(sorted(history), sorted(ids))
+        self.assertTrue(all(len(entries) == 3 for entries in history.values()))
+
+
+class GraphQLLimitsTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        category = ProductCategory.objects.create(name='Test')
+        for i in range(3):
+            Product.objects.create(
+                name=f'Widget {i}', category=category, base_price=100, current_price=100,
+                cost_price=60, stock_quantity=10, min_price=70, max_price=150
+            )
+
+    def post(self, body):
+        return self.client.post('/graphql/', body, content_type='application/json').json()
+
+    def error(self, body):
+        response = self.post(body)
+        self.assertIsNone(response.get('data'))
+        return response['errors'][0]['message']
+
+    @override_settings(GRAPHQL_MAX_ROWS=20)
+    def test_rejects_over_cost_query(self):
+        # 3 products x 10 history entries each
+        message = self.error({'query': '{ allProducts { name priceHistory { price } } }'})
+        self.assertIn('Query is too expensive', message)
+        self.assertEqual(len(self.post({'query': '{ allProducts { name category { name } } }'})['data']['allProducts']), 3)
+
+    @override_settings(GRAPHQL_MAX_DEPTH=1)
+    def test_rejects_over_deep_query(self):
+        self.assertIn('exceeds maximum operation depth', self.error({'query': '{ allProducts { category { id } } }'}))
+
+    def test_rejects_unknown_persisted_hash(self):
+        message = self.error({'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': '0' * 64}}})
+        self.assertEqual(message, 'PersistedQueryNotFound')
+
+    def test_debug_requires_staff(self):
+        from django.contrib.auth.models import User
+
+        queries = (
+            '{ _debug { sql { rawSql } } }',
+            'query { ...Debug } fragment Debug on Query { _debug { sql { rawSql } } }',
+            '{ ... on Query { ... on Query { _debug { sql { rawSql } } } } }',
+        )
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.error({'query': query}), '_debug is only available to staff users.')
+
+        user.is_staff = True
+        user.save()
+        for query in queries:
+            with self.subTest(query=query, staff=True):
+                self.assertIn('_debug', self.post({'query': query})['data'])
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        category = ProductCategory.objects.create(name='Test')
+        self.products = [
+            Product.objects.create(
+                name=f'Widget {i}', category=category, base_price=100, current_price=100,
+                cost_price=60, stock_quantity=10, min_price=70, max_price=150
+            )
+            for i in range(5)
+        ]
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_ties_on_last_price_update_are_ordered_by_id(self):
+        moment = timezone.now() - timedelta(hours=1)
+        Product.objects.update(last_price_update=moment)
+        ids = [product.id for product in self.products]
+
+        seen = []
+        cursor = None
+        for _ in range(3):
+            rows, cursor, has_more = changed_since(Product.objects.all(), cursor=cursor, limit=2)
+            seen += [row.id for row in rows]
+        self.assertEqual(seen, sorted(ids))
+        self.assertFalse(has_more)
+
+        # Nothing new: the cursor is handed back unchanged
+        rows, next_cursor, _ = changed_since(Product.objects.all(), cursor=cursor, limit=2)
+        self.assertEqual((rows, next_cursor), ([], cursor))
+
+        self.products[0].save()
+        # Held back until its transaction has surely committed
+        self.assertEqual(changed_since(Product.objects.all(), cursor=cursor, limit=2)[0], [])
+        with override_settings(PRICE_CHANGES_CURSOR_LAG_SECONDS=0):
+            rows, _, _ = changed_since(Product.objects.all(), cursor=cursor, limit=2)
+        self.assertEqual([row.id for row in rows], [self.products[0].id])
+
+    def test_recent_saves_wait_for_the_lag(self):
+        now = timezone.now()
+        Product.objects.update(last_price_update=now - timedelta(hours=1))
+        rows, cursor, _ = changed_since(Product.objects.all(), limit=10)
+        self.assertEqual(len(rows), 5)
+
+        # Saved 5s ago, but its transaction commits after a row saved 2s ago
+        Product.objects.filter(id=self.products[1].id).update(last_price_update=now - timedelta(seconds=2))
+        self.assertEqual(changed_since(Product.objects.all(), cursor=cursor)[:2], ([], cursor))
+        Product.objects.filter(id=self.products[3].id).update(last_price_update=now - timedelta(seconds=5))
+        self.assertEqual(changed_since(Product.objects.all(), cursor=cursor)[:2], ([], cursor))
+
+        with override_settings(PRICE_CHANGES_CURSOR_LAG_SECONDS=1):
+            rows, _, _ = changed_since(Product.objects.all(), cursor=cursor)
+        self.assertEqual([row.id for row in rows], [self.products[3].id, self.products[1].id])
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in ('not base64!', 'bm90IGEgY3Vyc29y', encode_cursor(timezone.now(), 1)[:-4] + 'AAAA',
+                       'MjAyNnwxfDI=', 'bm90LWEtZGF0ZXwx', 'MjAyNi0wMS0wMXx4'):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                changed_since(Product.objects.all(), cursor=cursor)
+
+
+class DashboardSummaryTests(TestCase):
+    def test_zero_base_price_does_not_break_price_adjustment(self):
+        category = ProductCategory.objects.create(name='Test')
+        for base_price, current_price in ((100, 110), (0, 5)):
+            Product.objects.create(
+                name=f'Widget {base_price}', category=category, base_price=base_price, current_price=current_price,
+                cost_price=0, stock_quantity=10, min_price=0, max_price=150
+            )
+
+        summary = build_dashboard_summary()
+
+        self.assertEqual(summary['dynamic_pricing_count'], 2)
+        self.assertAlmostEqual(summary['avg_price_adjustment'], 10.0)
+        adjustments = {product.base_price: product.price_diff_percent for product in summary['recently_updated']}
+        self.assertAlmostEqual(adjustments[100], 10.0)
+        self.assertEqual(adjustments[0], 0)
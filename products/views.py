@@ -1,9 +1,17 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
 from django.core.management import call_command
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.cache import parse_etags
+from .cache import current_prices_version, get_current_prices
+from .exports import EXPORT_FORMATS, export_rows, parse_export_time
+from .sync import changed_since
 from .serializers import ProductSerializer, ProductCategorySerializer, ProductPriceHistorySerializer
 from .models import Product, ProductCategory, ProductPriceHistory
+from .pagination import PriceHistoryCursorPagination, ProductCursorPagination
 from .throttles import PricingRateThrottle
 from oauth2_provider.contrib.rest_framework import OAuth2Authentication, TokenHasScope
 from rest_framework.permissions import IsAuthenticated
@@ -20,6 +28,28 @@ class ProductViewSet(viewsets.ModelViewSet):
     permission_classes = [TokenHasScope]
     required_scopes = ['pricing.read'] 
     throttle_classes = [PricingRateThrottle]
+    pagination_class = ProductCursorPagination
+
+    def include_history(self):
+        """?include_history=false leaves the nested price history out"""
+        value = self.request.query_params.get('include_history', 'true')
+        return value.lower() not in ('0', 'false', 'no')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.include_history():
+            # One windowed query fetches the latest N rows for the whole page
+            limit = getattr(settings, 'PRODUCT_HISTORY_LIMIT', 10)
+            recent = ProductPriceHistory.objects.order_by('-timestamp', '-id')[:limit]
+            queryset = queryset.prefetch_related(
+                Prefetch('price_history', queryset=recent, to_attr='recent_price_history')
+            )
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_history'] = self.include_history()
+        return context
 
     def get_permissions(self):
         print("== Debug: Required scopes =", self.required_scopes)
@@ -33,10 +63,35 @@ class ProductViewSet(viewsets.ModelViewSet):
     def current_prices(self, request):
         """
         Custom endpoint to retrieve product name and current price.
+        Served from a versioned cache snapshot; send If-None-Match with the
+        returned ETag to get a 304 while nothing has changed.
         """
-        products = Product.objects.all()
-        data = [{"id": p.id, "name": p.name, "current_price": p.current_price} for p in products]
-        return Response(data)
+        etag = f'"current-prices-{current_prices_version()}"'
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        version, data = get_current_prices()
+        return Response(data, headers={'ETag': f'"current-prices-{version}"'})
+
+    @action(detail=False, methods=['get'], throttle_classes=[PricingRateThrottle])
+    def price_changes(self, request):
+        """
+        Delta sync: products updated after ?cursor=, oldest first. Any product
+        save bumps last_price_update, not only price changes, and changes show
+        up once they are PRICE_CHANGES_CURSOR_LAG_SECONDS old.
+        Omit the cursor for a full first pass, then keep passing next_cursor.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 500))
+            rows, next_cursor, has_more = changed_since(
+                Product.objects.values('id', 'name', 'current_price', 'last_price_update'),
+                cursor=request.query_params.get('cursor'),
+                limit=limit
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': rows, 'next_cursor': next_cursor, 'has_more': has_more})
 
     @action(detail=False, methods=['post'], throttle_classes=[PricingRateThrottle])
     def trigger_price_update(self, request):
@@ -58,3 +113,30 @@ class ProductCategoryViewSet(viewsets.ModelViewSet):
 class ProductPriceHistoryViewSet(viewsets.ModelViewSet):
     queryset = ProductPriceHistory.objects.all()
     serializer_class = ProductPriceHistorySerializer
+    pagination_class = PriceHistoryCursorPagination
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream price history as NDJSON (default) or CSV with ?output=csv.
+        Filters: ?product=, ?category=, ?since= and ?until= (ISO date or datetime).
+        """
+        params = request.query_params
+        output = params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': f"output must be one of {', '.join(EXPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = export_rows(
+                product=params.get('product'),
+                category=params.get('category'),
+                since=parse_export_time(params.get('since')),
+                until=parse_export_time(params.get('until'), end_of_day=True)
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type, extension = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="price-history.{extension}"'
+        return response
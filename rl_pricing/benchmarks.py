@@ -0,0 +1,278 @@
+"""
+Reproducible performance benchmarks for the pricing stack.
+
+Everything runs inside ``benchmark_environment``: a throwaway test database
+(in-memory SQLite with the default settings), a private cache, a scratch
+directory for model files and no API throttling, so a run never touches real
+data or trained models. The catalog is synthetic and seeded.
+
+``run_benchmarks`` returns a JSON-ready report whose ``metrics`` map a name
+to its value, unit and whether higher or lower is better; ``compare``
+checks one report against a baseline for regressions.
+"""
+import io
+import os
+import platform
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULT_SIZES = (100, 10000, 100000)
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rl-benchmarks'}
+}
+GRAPHQL_LIST_QUERY = '{ allProducts { id name currentPrice priceHistory { price timestamp } } }'
+
+
+def metric(value, unit, better):
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+
+def latency_metrics(name, samples):
+    """p50/p99 in milliseconds of per-call durations in seconds"""
+    samples = np.asarray(samples) * 1000
+    return {
+        f'{name}.p50_ms': metric(np.percentile(samples, 50), 'ms', 'lower'),
+        f'{name}.p99_ms': metric(np.percentile(samples, 99), 'ms', 'lower'),
+    }
+
+
+def timed_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+@contextmanager
+def benchmark_environment():
+    """Throwaway database, cache and model directory; stdout of the code under test is discarded"""
+    from rl_pricing.model_cache import policy_cache
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='rl_benchmarks_')
+    os.chdir(workdir)
+    policy_cache.clear()
+    try:
+        rates = {scope: None for scope in SimpleRateThrottle.THROTTLE_RATES}
+        with override_settings(CACHES=BENCHMARK_CACHES), \
+                mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, rates), \
+                redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        policy_cache.clear()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_catalog(count, seed=0, history_rows=10):
+    """
+    Grow the synthetic catalog to ``count`` products (see
+    ``products.synthetic``). Returns the ids of the products added.
+    """
+    from products.models import Product
+    from products.synthetic import generate_catalog
+
+    existing = Product.objects.count()
+    if count <= existing:
+        return []
+    result = generate_catalog(
+        products=count - existing, history_rows=history_rows, categories=1, days=14, seed=seed + existing
+    )
+    return result['product_ids']
+
+
+def install_models(template, product_ids):
+    """Hard-link a trained model's files for ``product_ids`` so inference finds one per product"""
+    from rl_pricing.trainer import PricingModelTrainer
+
+    # Same order save_model writes them, so the .npz export stays newer than the .zip
+    sources = [template.model_zip_path, template.policy_path, template.metadata_path]
+    for product_id in product_ids:
+        trainer = PricingModelTrainer(product_id)
+        for source, target in zip(sources, [trainer.model_zip_path, trainer.policy_path, trainer.metadata_path]):
+            if os.path.exists(target):
+                continue
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+
+def bench_env(product_id, steps):
+    from rl_pricing.environment import ProductPricingEnv
+
+    results = {}
+    env = ProductPricingEnv(product_id, simulate=True)
+    env.reset()
+    started = time.perf_counter()
+    for step in range(steps):
+        _, _, done, _, _ = env.step(step % 5)
+        if done:
+            env.reset()
+    results['env.simulated_step'] = metric(steps / (time.perf_counter() - started), 'steps/s', 'higher')
+
+    started = time.perf_counter()
+    for _ in range(steps):
+        env.reset()
+    results['env.simulated_reset'] = metric(steps / (time.perf_counter() - started), 'resets/s', 'higher')
+
+    started = time.perf_counter()
+    for _ in range(steps // 10):
+        env.reset(options={'reload': True})
+    results['env.reload_reset'] = metric(steps // 10 / (time.perf_counter() - started), 'resets/s', 'higher')
+
+    # The live env writes the product and a history row every step
+    live = ProductPricingEnv(product_id)
+    live.reset()
+    live_steps = max(steps // 100, 10)
+    started = time.perf_counter()
+    for step in range(live_steps):
+        live.step(2 + step % 2)
+    results['env.live_step'] = metric(live_steps / (time.perf_counter() - started), 'steps/s', 'higher')
+    return results
+
+
+def bench_training(product_ids, timesteps):
+    """Trains PPO then DQN (the model files are shared per product); returns metrics and the DQN trainer"""
+    from rl_pricing.trainer import PricingModelTrainer
+
+    results = {}
+    trainer = None
+    for algorithm, product_id in (('PPO', product_ids[1]), ('DQN', product_ids[0])):
+        trainer = PricingModelTrainer(product_id, algorithm=algorithm)
+        trainer.train(total_timesteps=timesteps)
+        results[f'train.{algorithm.lower()}'] = metric(
+            trainer.last_run['metrics']['steps_per_second'], 'steps/s', 'higher'
+        )
+    return results, trainer
+
+
+def bench_predict(trainer, repeat):
+    trainer.load_model()
+    return latency_metrics('predict_price_change', timed_calls(trainer.predict_price_change, repeat))
+
+
+def bench_update_cycle(size):
+    from rl_pricing.tasks import update_product_prices
+
+    started = time.perf_counter()
+    update_product_prices()
+    seconds = time.perf_counter() - started
+    return {
+        f'update_product_prices.{size}': metric(seconds, 's', 'lower'),
+        f'update_product_prices.{size}.products_per_second': metric(size / seconds, 'products/s', 'higher'),
+    }
+
+
+def bench_api(repeat):
+    from django.contrib.auth.models import User
+    from oauth2_provider.models import AccessToken, Application
+
+    user = User.objects.create_user('benchmark')
+    application = Application.objects.create(
+        name='benchmark', user=user, client_type='confidential', authorization_grant_type='client-credentials'
+    )
+    token = AccessToken.objects.create(
+        user=user, application=application, token='benchmark-token', scope='pricing pricing.read',
+        expires=timezone.now() + timedelta(days=1)
+    )
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {token.token}')
+
+    def rest_list():
+        response = client.get('/rest/products/')
+        if response.status_code != 200:
+            raise RuntimeError(f"REST list failed with status {response.status_code}")
+
+    def graphql_list():
+        response = client.post('/graphql/', {'query': GRAPHQL_LIST_QUERY}, content_type='application/json')
+        if response.status_code != 200 or 'errors' in response.json():
+            raise RuntimeError(f"GraphQL list failed: {response.content[:200]!r}")
+
+    return {
+        **latency_metrics('rest.products_list', timed_calls(rest_list, repeat)),
+        **latency_metrics('graphql.all_products', timed_calls(graphql_list, repeat)),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, train_timesteps=2000, env_steps=10000, repeat=50, seed=0, progress=None):
+    """
+    Run the whole suite and return the report. ``progress`` is called with a
+    message before each stage.
+    """
+    import django
+    import stable_baselines3
+    import torch
+
+    progress = progress or (lambda message: None)
+    sizes = sorted(sizes)
+    metrics = {}
+    with benchmark_environment():
+        ids = seed_catalog(max(sizes[0], 2), seed=seed)
+
+        progress(f"Environment: {env_steps} steps")
+        metrics.update(bench_env(ids[0], env_steps))
+
+        progress(f"Training: DQN and PPO for {train_timesteps} timesteps")
+        training, template = bench_training(ids, train_timesteps)
+        metrics.update(training)
+
+        progress(f"Inference: {repeat} predictions")
+        metrics.update(bench_predict(template, repeat))
+
+        progress(f"API: {repeat} REST and GraphQL list requests over {sizes[0]} products")
+        metrics.update(bench_api(repeat))
+
+        install_models(template, ids)
+        for size in sizes:
+            progress(f"Update cycle: {size} products")
+            install_models(template, seed_catalog(size, seed=seed))
+            metrics.update(bench_update_cycle(size))
+
+    return {
+        'created_at': timezone.now().isoformat(),
+        'settings': {
+            'sizes': sizes, 'train_timesteps': train_timesteps, 'env_steps': env_steps,
+            'repeat': repeat, 'seed': seed,
+        },
+        'versions': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'numpy': np.__version__,
+            'torch': torch.__version__,
+            'stable_baselines3': stable_baselines3.__version__,
+        },
+        'metrics': metrics,
+    }
+
+
+def compare(report, baseline, threshold):
+    """
+    Metrics present in both reports that got worse by more than
+    ``threshold`` percent, as (name, baseline value, value, change %) tuples.
+    """
+    regressions = []
+    for name, current in report['metrics'].items():
+        previous = baseline.get('metrics', {}).get(name)
+        if previous is None or previous['value'] == 0:
+            continue
+        change = (current['value'] - previous['value']) / abs(previous['value']) * 100
+        worse = change if current['better'] == 'lower' else -change
+        if worse > threshold:
+            regressions.append((name, previous['value'], current['value'], change))
+    return regressions
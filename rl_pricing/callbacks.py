@@ -0,0 +1,175 @@
+import math
+import time
+import numpy as np
+from django.conf import settings
+from stable_baselines3.common.callbacks import BaseCallback
+
+
+class RingBuffer:
+    """Fixed-size float window; memory stays constant however long training runs"""
+
+    def __init__(self, size):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()[-len(self.values):]
+        positions = (self.count + np.arange(len(values))) % len(self.values)
+        self.values[positions] = values
+        self.count += len(values)
+
+    def mean(self):
+        filled = min(self.count, len(self.values))
+        return float(self.values[:filled].mean()) if filled else None
+
+
+class TrainingMetricsCallback(BaseCallback):
+    """
+    Rolling training telemetry in constant memory.
+
+    Tracks the mean step reward over the last ``window`` steps, mean return
+    and length of the last ``window`` episodes (from the Monitor wrapper),
+    env steps and gradient updates per second, and splits wall time into
+    env time (rollout collection, including action selection), DB time
+    and learner time (gradient updates). DB time covers the queries run
+    inside ``connection.execute_wrapper(callback.time_query)``, so wrap
+    ``learn()`` in it; the callback's own metric writes are left out of
+    every bucket. ``metrics()`` returns them as a JSON-ready dict; with
+    a ``session`` they are written to that TrainingSession every
+    RL_TRAINING_METRICS_INTERVAL seconds and once training ends.
+    """
+
+    def __init__(self, session=None, window=1000, interval=None, verbose=0):
+        super().__init__(verbose)
+        # Set by init_callback when learn() starts
+        self.model = None
+        self.session = session
+        self.interval = interval if interval is not None else getattr(settings, 'RL_TRAINING_METRICS_INTERVAL', 10)
+        self.step_rewards = RingBuffer(window)
+        self.episode_rewards = RingBuffer(window)
+        self.episode_lengths = RingBuffer(window)
+        self.episodes = 0
+        self.steps = 0
+        self.env_seconds = 0.0
+        self.db_seconds = 0.0
+        self.learner_seconds = 0.0
+        self.telemetry_seconds = 0.0
+        self._started = None
+        self._ended = None
+        self._phase_started = None
+        self._phase_db = 0.0
+        self._phase_telemetry = 0.0
+        self._flushing = False
+        self._last_flush = None
+        self._start_updates = 0
+
+    def time_query(self, execute, sql, params, many, context):
+        if self._flushing:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+
+    def _end_phase(self):
+        """Wall time since the phase started, minus the DB and telemetry time spent inside it"""
+        now = time.perf_counter()
+        elapsed = (
+            now - self._phase_started
+            - (self.db_seconds - self._phase_db)
+            - (self.telemetry_seconds - self._phase_telemetry)
+        )
+        self._phase_started = now
+        self._phase_db = self.db_seconds
+        self._phase_telemetry = self.telemetry_seconds
+        return max(elapsed, 0.0)
+
+    def _gradient_updates(self):
+        updates = getattr(self.model, '_n_updates', 0) - self._start_updates
+        # PPO counts epochs; each epoch is one optimizer step per minibatch
+        if hasattr(self.model, 'n_epochs'):
+            updates *= math.ceil(self.model.n_steps * self.model.n_envs / self.model.batch_size)
+        return updates
+
+    def _on_training_start(self):
+        self._started = self._phase_started = self._last_flush = time.perf_counter()
+        self._start_updates = getattr(self.model, '_n_updates', 0)
+
+    def _on_rollout_start(self):
+        self.learner_seconds += self._end_phase()
+
+    def _on_rollout_end(self):
+        self.env_seconds += self._end_phase()
+
+    def _on_step(self) -> bool:
+        self.steps += self.training_env.num_envs
+        self.step_rewards.extend(self.locals.get('rewards', []))
+        for info in self.locals.get('infos', []):
+            episode = info.get('episode')
+            if episode:
+                self.episodes += 1
+                self.episode_rewards.extend([episode['r']])
+                self.episode_lengths.extend([episode['l']])
+
+        if time.perf_counter() - self._last_flush >= self.interval:
+            self.flush()
+        return True
+
+    def _on_training_end(self):
+        self.learner_seconds += self._end_phase()
+        self._ended = time.perf_counter()
+        self.flush()
+
+    def metrics(self):
+        wall = 0.0
+        if self._started is not None:
+            wall = (self._ended or time.perf_counter()) - self._started
+        updates = self._gradient_updates() if self.model is not None else 0
+        return {
+            'timesteps': self.steps,
+            'episodes': self.episodes,
+            'reward_mean': self.step_rewards.mean(),
+            'episode_reward_mean': self.episode_rewards.mean(),
+            'episode_length_mean': self.episode_lengths.mean(),
+            'gradient_updates': updates,
+            'steps_per_second': self.steps / wall if wall else 0.0,
+            'updates_per_second': updates / wall if wall else 0.0,
+            'wall_seconds': wall,
+            'env_seconds': self.env_seconds,
+            'db_seconds': self.db_seconds,
+            'learner_seconds': self.learner_seconds,
+            'telemetry_seconds': self.telemetry_seconds,
+        }
+
+    def flush(self):
+        """Print the rolling metrics and store them on the session, if any"""
+        started = self._last_flush = time.perf_counter()
+        metrics = self.metrics()
+        summary = format_metrics(metrics)
+        if self.verbose:
+            print(f"Timestep: {self.num_timesteps}, {summary}")
+        if self.session is not None:
+            self.session.metrics = metrics
+            # Not training work: kept out of db_seconds and the phase timings
+            self._flushing = True
+            try:
+                type(self.session).objects.filter(pk=self.session.pk).update(
+                    metrics=metrics, log_output=f"In progress: {summary}"
+                )
+            finally:
+                self._flushing = False
+        self.telemetry_seconds += time.perf_counter() - started
+
+
+def format_metrics(metrics):
+    """One-line summary of a metrics dict for log_output"""
+    parts = [f"{metrics['timesteps']} steps"]
+    if metrics['reward_mean'] is not None:
+        parts.append(f"avg reward {metrics['reward_mean']:.3f}")
+    parts += [
+        f"{metrics['steps_per_second']:.0f} steps/s",
+        f"{metrics['updates_per_second']:.0f} updates/s",
+        f"env {metrics['env_seconds']:.2f}s / db {metrics['db_seconds']:.2f}s / learner {metrics['learner_seconds']:.2f}s",
+    ]
+    return ', '.join(parts)
@@ -1,18 +1,41 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
+from products.cache import invalidate_current_prices
+from products.features import get_sales_features, record_price_history, state_sales_columns
 from products.models import Product, ProductPriceHistory
+from rl_pricing.state import PRICE_CHANGE_PERCENTAGES, load_snapshots
+from django.db import transaction
 from django.utils import timezone
 from decimal import Decimal
-from datetime import timedelta
 
-class ProductPricingEnv(gym.Env):
-    """Custom Environment for product pricing following Gymnasium interface"""
 
-    def __init__(self, product_id):
+class ProductPricingEnv(gym.Env):
+    """Custom Environment for product pricing following Gymnasium interface
+
+    With ``simulate=True`` the product and its last 7 days of sales are loaded
+    once and every step runs in NumPy without touching the database. Simulated
+    price changes are only written back (in one transaction) when
+    ``write_back=True``, at the end of each episode or on ``flush()``.
+    A simulated env can also start from a ``snapshot`` already loaded in
+    bulk (one product's scalars from ``load_snapshots``), skipping the
+    product queries entirely.
+    """
+
+    def __init__(self, product_id, simulate=False, write_back=False, snapshot=None):
         super(ProductPricingEnv, self).__init__()
         self.product_id = product_id
-        self.product = Product.objects.get(id=product_id)
+        self.simulate = simulate
+        self.write_back = write_back
+
+        # Simulation mode: snapshot loaded on first reset unless given, pending history rows
+        self._snapshot = dict(snapshot) if simulate and snapshot is not None else None
+        if self._snapshot is None:
+            self.product = Product.objects.get(id=product_id)
+            min_price, max_price = self.product.min_price, self.product.max_price
+        else:
+            self.product = None
+            min_price, max_price = self._snapshot['min_price'], self._snapshot['max_price']
 
         # Define 5 discrete actions
         # 0: -10%, 1: -5%, 2: no change, 3: +5%, 4: +10%
@@ -21,15 +44,15 @@ class ProductPricingEnv(gym.Env):
         INF = np.finfo(np.float32).max
         self.observation_space = spaces.Box(
             low=np.array([
-                self.product.min_price,
-                self.product.min_price,
+                min_price,
+                min_price,
                 0,
                 0,
                 0
             ], dtype=np.float32),
             high=np.array([
-                self.product.max_price,
-                self.product.max_price,
+                max_price,
+                max_price,
                 INF,
                 30,
                 INF
@@ -41,22 +64,15 @@ class ProductPricingEnv(gym.Env):
         self.max_steps = 100
         self.state = None
 
+        self._sales_count = 0
+        self._days_since_last = 30.0
+        self._pending_history = []
+
     def _get_state(self):
         """Helper to get the current state"""
-        week_ago = timezone.now() - timedelta(days=7)
-        sales_data = ProductPriceHistory.objects.filter(
-            product=self.product,
-            timestamp__gte=week_ago
-        ).order_by('timestamp')
-
-        if sales_data.exists():
-            sales_count = sales_data.count()
-            avg_sales = sales_count / 7
-        else:
-            avg_sales = 0.0
-
-        last_sale = sales_data.last()
-        days_since_last = (timezone.now() - last_sale.timestamp).days if last_sale else 30
+        feature = get_sales_features([self.product_id])[self.product_id]
+        days_since_last, sales_count = state_sales_columns(feature)
+        avg_sales = sales_count / 7
 
         return np.array([
             float(self.product.current_price),
@@ -66,20 +82,51 @@ class ProductPricingEnv(gym.Env):
             float(avg_sales)
         ], dtype=np.float32)
 
+    def _load_snapshot(self):
+        """Load the product and its 7-day sales summary for simulation (2 queries)"""
+        snapshot = load_snapshots([self.product_id])
+        self._snapshot = {
+            field: float(values[0])
+            for field, values in snapshot.items() if field != 'ids'
+        }
+
+    def _simulated_state(self):
+        snapshot = self._snapshot
+        return np.array([
+            self._price,
+            snapshot['base_price'],
+            snapshot['stock_quantity'],
+            self._days_since_last,
+            self._sales_count / 7
+        ], dtype=np.float32)
+
     def reset(self, *, seed=None, options=None):
         """Reset environment state"""
         super().reset(seed=seed)
-        self.product.refresh_from_db()
         self.current_step = 0
+
+        if self.simulate:
+            if self._snapshot is None or (options or {}).get('reload'):
+                self._load_snapshot()
+            self._price = self._snapshot['current_price']
+            self._sales_count = self._snapshot['sales_count']
+            self._days_since_last = self._snapshot['days_since_last']
+            self._pending_history = []
+            self.state = self._simulated_state()
+            return self.state, {}
+
+        self.product.refresh_from_db()
         self.state = self._get_state()
         return self.state, {}
 
     def step(self, action):
         """Apply an action (discrete price adjustment)"""
+        if self.simulate:
+            return self._simulated_step(action)
+
         self.current_step += 1
 
-        price_change_percentages = [-0.10, -0.05, 0.0, 0.05, 0.10]
-        price_change = price_change_percentages[action]
+        price_change = PRICE_CHANGE_PERCENTAGES[action]
 
         current_price = float(self.product.current_price)
         new_price = current_price * (1 + price_change)
@@ -110,7 +157,63 @@ class ProductPricingEnv(gym.Env):
 
         return self.state, reward, done, truncated, {}
 
-    
+    def _simulated_step(self, action):
+        """Same transition and reward as ``step`` but computed in memory"""
+        self.current_step += 1
+        snapshot = self._snapshot
+
+        price_change = float(PRICE_CHANGE_PERCENTAGES[action])
+        new_price = float(np.clip(
+            self._price * (1 + price_change),
+            snapshot['min_price'],
+            snapshot['max_price']
+        ))
+        self._price = new_price
+
+        # Every step logs a history row, which counts as a sale "today"
+        self._sales_count += 1
+        self._days_since_last = 0.0
+        if self.write_back:
+            self._pending_history.append((new_price, price_change * 100))
+
+        self.state = self._simulated_state()
+        reward = (new_price - snapshot['cost_price']) / new_price
+
+        done = self.current_step >= self.max_steps
+        if done and self.write_back:
+            self.flush()
+
+        return self.state, reward, done, False, {}
+
+    def flush(self):
+        """Write pending simulated prices back to the database in one transaction"""
+        if not self._pending_history:
+            return 0
+
+        rows = [
+            ProductPriceHistory(
+                product_id=self.product_id,
+                price=Decimal(str(round(price, 2))),
+                change_percentage=change_percentage,
+            )
+            for price, change_percentage in self._pending_history
+        ]
+        with transaction.atomic():
+            ProductPriceHistory.objects.bulk_create(rows)
+            record_price_history(rows)
+            Product.objects.filter(id=self.product_id).update(
+                current_price=rows[-1].price,
+                last_price_update=timezone.now()
+            )
+        invalidate_current_prices()
+
+        self._snapshot.update(
+            current_price=self._price,
+            sales_count=self._sales_count,
+            days_since_last=self._days_since_last
+        )
+        self._pending_history = []
+        return len(rows)
 
     def _calculate_reward(self, new_price):
         
@@ -123,7 +226,9 @@ class ProductPricingEnv(gym.Env):
 
 
     def render(self, mode="human"):
-        print(f"Step: {self.current_step}, Price: {self.product.current_price:.2f}")
+        price = self._price if self.simulate and self._snapshot else self.product.current_price
+        print(f"Step: {self.current_step}, Price: {price:.2f}")
 
     def close(self):
-        pass
+        if self.simulate and self.write_back:
+            self.flush()
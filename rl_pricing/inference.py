@@ -0,0 +1,41 @@
+from collections import defaultdict
+import numpy as np
+from rl_pricing.policies import batched_greedy_actions, get_mlp_weights
+
+# Action returned for products whose model could not be loaded or run
+NO_DECISION = -1
+
+
+def predict_actions(product_ids, observations, algorithm='DQN'):
+    """
+    Greedy pricing actions for many products at once.
+
+    ``observations`` is the (N, 5) matrix for ``product_ids``. Products whose
+    policies share an architecture go through one stacked forward pass; any
+    other policy falls back to ``model.predict``. Returns an (N,) action
+    vector; a product whose model fails gets ``NO_DECISION`` and does not
+    affect the others.
+    """
+    from rl_pricing.trainer import PricingModelTrainer
+
+    observations = np.asarray(observations, dtype=np.float32)
+    actions = np.empty(len(product_ids), dtype=np.int64)
+    groups = defaultdict(list)
+
+    for i, product_id in enumerate(product_ids):
+        try:
+            model = PricingModelTrainer(product_id, algorithm=algorithm).load_or_create_model()
+            weights = get_mlp_weights(model)
+            if weights is None:
+                actions[i], _ = model.predict(observations[i], deterministic=True)
+            else:
+                groups[weights.signature].append((i, weights))
+        except Exception as e:
+            print(f"❌ Failed to predict a price for product {product_id}: {e}")
+            actions[i] = NO_DECISION
+
+    for members in groups.values():
+        indices = [i for i, _ in members]
+        actions[indices] = batched_greedy_actions([w for _, w in members], observations[indices])
+
+    return actions
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from products.models import Product  
-from ...trainer import PricingModelTrainer  
+from ...training import train_products
 
 class Command(BaseCommand):
     help = 'Retrain RL models for all products using the given timesteps.'
@@ -12,19 +12,50 @@ class Command(BaseCommand):
             default=1000,
             help='Number of timesteps for training the RL model'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of training processes (defaults to RL_TRAINING_WORKERS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1,
+            help='Number of products handed to a worker process at a time'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Continue training existing models on new experience instead of starting from scratch'
+        )
 
     def handle(self, *args, **options):
         timesteps = options['timesteps']
-        products = Product.objects.filter(pricing_strategy='RL')
+        products = dict(Product.objects.filter(pricing_strategy='RL').values_list('id', 'name'))
 
-        if not products.exists():
+        if not products:
             self.stdout.write(self.style.WARNING("⚠️ No RL products found."))
             return
 
-        for product in products:
-            try:
-                trainer = PricingModelTrainer(product.id)
-                trainer.train(total_timesteps=timesteps)
-                self.stdout.write(self.style.SUCCESS(f"✅ Trained RL model for product {product.name}"))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"❌ Failed to train model for {product.name}: {e}"))
+        results = train_products(
+            list(products),
+            timesteps=timesteps,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            incremental=options['incremental']
+        )
+        trained = failed = 0
+        for result in results:
+            name = products[result['product_id']]
+            if result['successful']:
+                trained += 1
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {result['mode'].capitalize()} training for product {name}: "
+                    f"{result['timesteps']} timesteps in {result['duration']:.1f}s"
+                ))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"❌ Failed to train model for {name}: {result['error']}"))
+
+        self.stdout.write(f"Done: {trained} trained, {failed} failed.")
@@ -0,0 +1,91 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from ...benchmarks import DEFAULT_SIZES, compare, run_benchmarks
+
+class Command(BaseCommand):
+    help = 'Benchmark the env, training, inference, update cycle and list APIs on a throwaway database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='benchmarks.json',
+            help='Where to write the JSON report'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=None,
+            help='Earlier JSON report to compare against'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Fail when a metric is worse than the baseline by more than this percentage'
+        )
+        parser.add_argument(
+            '--sizes',
+            default=','.join(str(size) for size in DEFAULT_SIZES),
+            help='Comma-separated catalog sizes for the update_product_prices benchmark'
+        )
+        parser.add_argument(
+            '--train-timesteps',
+            type=int,
+            default=2000,
+            help='Timesteps per DQN/PPO training benchmark'
+        )
+        parser.add_argument(
+            '--env-steps',
+            type=int,
+            default=10000,
+            help='Environment steps per env benchmark'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Calls per latency benchmark'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the synthetic catalog'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers.")
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        report = run_benchmarks(
+            sizes=sizes,
+            train_timesteps=options['train_timesteps'],
+            env_steps=options['env_steps'],
+            repeat=options['repeat'],
+            seed=options['seed'],
+            progress=lambda message: self.stdout.write(f"⏱️ {message}")
+        )
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for name, result in report['metrics'].items():
+            self.stdout.write(f"{name:<50} {result['value']:>12.2f} {result['unit']}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {len(report['metrics'])} metrics to {options['output']}"))
+
+        if baseline is None:
+            return
+        regressions = compare(report, baseline, options['threshold'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ No metric is more than {options['threshold']:g}% worse than {options['baseline']}"
+            ))
+            return
+        for name, previous, current, change in regressions:
+            self.stdout.write(self.style.ERROR(f"❌ {name}: {previous:.2f} -> {current:.2f} ({change:+.1f}%)"))
+        raise CommandError(f"{len(regressions)} metrics regressed by more than {options['threshold']:g}%.")
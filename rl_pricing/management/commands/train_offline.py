@@ -0,0 +1,64 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.models import Product
+from ...offline import train_offline
+
+class Command(BaseCommand):
+    help = 'Train DQN pricing models for all RL products from logged price history, without touching live prices.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Only learn from history logged in the last N days (default: all history)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Fitted Q-iteration rounds (each recomputes the Bellman targets)'
+        )
+        parser.add_argument(
+            '--epochs',
+            type=int,
+            default=2,
+            help='Passes over the data per iteration'
+        )
+        parser.add_argument(
+            '--gamma',
+            type=float,
+            default=0.99,
+            help='Discount factor'
+        )
+        parser.add_argument(
+            '--bc-weight',
+            type=float,
+            default=0.5,
+            help='Weight of the behaviour-cloning term that keeps the policy near logged actions'
+        )
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.filter(pricing_strategy='RL').values_list('id', flat=True))
+        if not product_ids:
+            self.stdout.write(self.style.WARNING("⚠️ No RL products found."))
+            return
+
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        result = train_offline(
+            product_ids,
+            since=since,
+            iterations=options['iterations'],
+            epochs=options['epochs'],
+            gamma=options['gamma'],
+            bc_weight=options['bc_weight']
+        )
+        if not result['products']:
+            self.stdout.write(self.style.WARNING("⚠️ No logged price history to learn from."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Trained {result['products']} models offline from {result['transitions']} transitions "
+            f"in {result['seconds']:.1f}s (loss {result['loss']:.4f})"
+        ))
@@ -0,0 +1,123 @@
+from django.core.management.base import BaseCommand
+from ...tuning import tune, tuning_groups
+
+class Command(BaseCommand):
+    help = 'Tune RL hyperparameters per category (or product) with successive halving and store the best configuration.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--algorithm',
+            choices=['DQN', 'PPO'],
+            default='DQN',
+            help='Algorithm whose hyperparameters are tuned'
+        )
+        parser.add_argument(
+            '--scope',
+            choices=['category', 'product'],
+            default='category',
+            help='Pick the best configuration per category or per product'
+        )
+        parser.add_argument(
+            '--category',
+            type=int,
+            action='append',
+            dest='categories',
+            help='Only tune this category id (repeatable)'
+        )
+        parser.add_argument(
+            '--sample-size',
+            type=int,
+            default=3,
+            help='Products of each category that trials run on'
+        )
+        parser.add_argument(
+            '--configs',
+            type=int,
+            default=9,
+            help='Configurations sampled from the search space per group'
+        )
+        parser.add_argument(
+            '--min-timesteps',
+            type=int,
+            default=2000,
+            help='Timesteps every configuration trains for in the first rung'
+        )
+        parser.add_argument(
+            '--max-timesteps',
+            type=int,
+            default=None,
+            help='Stop adding rungs once the budget would exceed this'
+        )
+        parser.add_argument(
+            '--eta',
+            type=int,
+            default=3,
+            help='Keep the best 1/eta configurations per rung, each trained eta times longer'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of training processes (defaults to RL_TRAINING_WORKERS)'
+        )
+        parser.add_argument(
+            '--eval-episodes',
+            type=int,
+            default=1,
+            help='Evaluation episodes used to score a configuration'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for sampling configurations, products and models'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the best configurations without storing them'
+        )
+
+    def handle(self, *args, **options):
+        if options['eta'] < 2:
+            self.stdout.write(self.style.ERROR("❌ --eta must be at least 2."))
+            return
+
+        groups = tuning_groups(
+            scope=options['scope'],
+            category_ids=options['categories'],
+            sample_size=options['sample_size'],
+            seed=options['seed']
+        )
+        if not groups:
+            self.stdout.write(self.style.WARNING("⚠️ No RL products found."))
+            return
+
+        results = tune(
+            groups,
+            algorithm=options['algorithm'],
+            configs=options['configs'],
+            min_timesteps=options['min_timesteps'],
+            max_timesteps=options['max_timesteps'],
+            eta=options['eta'],
+            workers=options['workers'],
+            eval_episodes=options['eval_episodes'],
+            seed=options['seed'],
+            apply=not options['dry_run']
+        )
+        spent = grid = 0
+        for result in results:
+            spent += result['timesteps']
+            grid += result['grid_timesteps']
+            if result['score'] is None:
+                self.stdout.write(self.style.ERROR(f"❌ Every configuration failed for {result['group']}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {result['group']}: mean reward {result['score']:.3f} with {result['config']} "
+                f"({result['products']} products updated)"
+            ))
+
+        self.stdout.write(
+            f"Done: {spent} timesteps trained, {spent / max(grid, 1):.0%} of training every sampled "
+            f"configuration to the final budget ({grid})."
+        )
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from products.models import Product
+from products.price_updates import PriceDecision, apply_price_decisions
 from rl_pricing.trainer import PricingModelTrainer
+from rl_pricing.model_cache import policy_cache
 
 class Command(BaseCommand):
     help = 'Updates product prices using RL models'
@@ -22,6 +24,7 @@ class Command(BaseCommand):
         self.stdout.write("Starting price update process...")
         
         products = Product.objects.all()
+        decisions = []
         
         for product in products:
             self.stdout.write(f"\nProcessing product: {product.name} (ID: {product.id})")
@@ -36,28 +39,27 @@ class Command(BaseCommand):
                     self.stdout.write(f"Loading or creating model for {product.name}...")
                     trainer.load_or_create_model()
                 
-                    current_price = float(product.current_price)
+                current_price = float(product.current_price)
 
-                    if product.pricing_strategy == 'RL':
-                        price_change = trainer.predict_price_change()
-                        new_price = current_price * (1 + price_change)
-                        strategy_used = "RL Model"
-                    else: 
-                        price_change = 0.02  
-                        new_price = current_price * (1 + price_change)
-                        strategy_used = "Static Pricing (+2%)"
+                if product.pricing_strategy == 'RL':
+                    price_change = trainer.predict_price_change()
+                    new_price = current_price * (1 + price_change)
+                    strategy_used = "RL Model"
+                else: 
+                    price_change = 0.02  
+                    new_price = current_price * (1 + price_change)
+                    strategy_used = "Static Pricing (+2%)"
 
-                    
-                    new_price = max(float(product.min_price), min(float(product.max_price), new_price))
+                
+                new_price = max(float(product.min_price), min(float(product.max_price), new_price))
 
                 
                 if abs(new_price - current_price) > 0.01: 
-                    product.current_price = new_price
-                    product.save()
+                    decisions.append(PriceDecision(product.id, new_price, price_change * 100))
                     self.stdout.write(
                         self.style.SUCCESS(
-                            f"Price updated from ${current_price:.2f} to ${new_price:.2f} "
-                            f"(change: {price_change*100:.1f}%)"
+                            f"Price update from ${current_price:.2f} to ${new_price:.2f} "
+                            f"(change: {price_change*100:.1f}%) queued"
                         )
                     )
                 else:
@@ -72,4 +74,15 @@ class Command(BaseCommand):
                 import traceback
                 self.stdout.write(self.style.ERROR(traceback.format_exc()))
         
+        result = apply_price_decisions(decisions)
+        self.stdout.write(
+            f"Saved {result['products']} price updates "
+            f"({result['rows']} rows, {result['rows_per_second']:.0f} rows/s)"
+        )
+
+        stats = policy_cache.stats()
+        self.stdout.write(
+            f"Model cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['evictions']} evictions ({stats['size']}/{stats['maxsize']} loaded)"
+        )
         self.stdout.write(self.style.SUCCESS("\nPrice update process completed!"))
\ No newline at end of file
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rl_pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rlmodel',
+            name='hyperparameters',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='trainingsession',
+            name='hyperparameters',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='trainingsession',
+            name='score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
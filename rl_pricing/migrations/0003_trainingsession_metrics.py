@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rl_pricing', '0002_hyperparameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingsession',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
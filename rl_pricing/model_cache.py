@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+
+def _load_policy(algorithm, path):
+    if path.endswith('.npz'):
+        from rl_pricing.policies import NumpyPolicy
+        return NumpyPolicy.load(path)
+
+    from stable_baselines3 import DQN, PPO
+
+    algorithms = {'DQN': DQN, 'PPO': PPO}
+    return algorithms[algorithm].load(path)
+
+
+class PolicyCache:
+    """
+    Bounded, thread-safe LRU cache of loaded SB3 models.
+
+    Entries are keyed on (product_id, algorithm, model file, mtime), so a model
+    saved by another process is picked up on the next lookup. ``.npz`` paths
+    load as NumpyPolicy, anything else as an SB3 model. Loaded models are
+    shared: callers must only use them for ``predict``.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, product_id, algorithm, path):
+        """Return the model saved at ``path``, loading it on a miss"""
+        key = (product_id, algorithm, path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        model = _load_policy(algorithm, path)
+
+        with self._lock:
+            self._discard(product_id, algorithm)
+            self._models[key] = model
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def invalidate(self, product_id, algorithm=None):
+        """Drop every cached version of a product's model"""
+        with self._lock:
+            self._discard(product_id, algorithm)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._models),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _discard(self, product_id, algorithm):
+        for key in [k for k in self._models if k[0] == product_id and algorithm in (None, k[1])]:
+            del self._models[key]
+
+
+policy_cache = PolicyCache(maxsize=getattr(settings, 'RL_POLICY_CACHE_SIZE', 128))
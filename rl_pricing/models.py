@@ -11,6 +11,8 @@ class RLModel(models.Model):
     algorithm = models.CharField(max_length=10, choices=ALGORITHM_CHOICES)
     model_file = models.FileField(upload_to='rl_models/')
     version = models.PositiveIntegerField(default=1)
+    # Tuned overrides of trainer.DEFAULT_HYPERPARAMS, written by tune_rl_models
+    hyperparameters = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
     
@@ -27,6 +29,11 @@ class TrainingSession(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     successful = models.BooleanField(default=False)
     log_output = models.TextField(blank=True)
+    # Set on tuning trials: the configuration tried and its evaluation reward
+    hyperparameters = models.JSONField(default=dict, blank=True)
+    score = models.FloatField(null=True, blank=True)
+    # Rolling throughput/reward telemetry, refreshed during training (callbacks.TrainingMetricsCallback)
+    metrics = models.JSONField(default=dict, blank=True)
     
     class Meta:
         ordering = ['-started_at']
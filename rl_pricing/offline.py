@@ -0,0 +1,277 @@
+"""
+Offline (batch) RL from logged price history.
+
+``build_transitions`` turns ProductPriceHistory into (state, action, reward,
+next_state, done) arrays for every product in one vectorized pass, using the
+same observation layout as ``ProductPricingEnv``. ``fit_q_network`` then runs
+fitted Q-iteration with a behaviour-cloning penalty over the pooled data and
+``save_offline_models`` writes one regular DQN model per product, so the
+existing ``PricingModelTrainer`` predict path loads them unchanged.
+"""
+import itertools
+import json
+import time
+import numpy as np
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from rl_pricing.state import PRICE_CHANGE_PERCENTAGES, SNAPSHOT_FIELDS
+from products.models import Product, ProductPriceHistory
+
+DAY_SECONDS = 86400.0
+SALES_WINDOW_SECONDS = 7 * DAY_SECONDS
+NO_SALE_DAYS = 30.0
+
+HISTORY_COLUMNS = ('product_id', 'timestamp', 'price', 'change_percentage', 'units_sold')
+
+
+def _load_history(product_ids=None, since=None, chunk_size=10000):
+    """History columns as NumPy arrays, converted one fetched chunk at a time"""
+    queryset = ProductPriceHistory.objects.order_by('product_id', 'timestamp', 'id')
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    if since is not None:
+        queryset = queryset.filter(timestamp__gte=since)
+
+    chunks = {column: [] for column in HISTORY_COLUMNS}
+    rows = queryset.values_list(*HISTORY_COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        product, timestamp, price, change, units = zip(*chunk)
+        chunks['product_id'].append(np.array(product, dtype=np.int64))
+        chunks['timestamp'].append(np.array([moment.timestamp() for moment in timestamp], dtype=np.float64))
+        chunks['price'].append(np.array(price, dtype=np.float64))
+        chunks['change_percentage'].append(np.array(change, dtype=np.float64))
+        chunks['units_sold'].append(np.array(units, dtype=np.float64))
+
+    dtypes = {'product_id': np.int64}
+    return {
+        column: np.concatenate(arrays) if arrays else np.empty(0, dtype=dtypes.get(column, np.float64))
+        for column, arrays in chunks.items()
+    }
+
+
+def _load_products(product_ids):
+    rows = Product.objects.filter(id__in=product_ids).values('id', *SNAPSHOT_FIELDS)
+    products = {row['id']: row for row in rows}
+    return {
+        field: np.array([float(products[pid][field]) for pid in product_ids])
+        for field in SNAPSHOT_FIELDS
+    }
+
+
+def _prices_before(product_ids, since):
+    """Each product's last logged price before ``since`` (NaN when there is none), in one query"""
+    prices = np.full(len(product_ids), np.nan)
+    if since is None:
+        return prices
+    rows = (
+        ProductPriceHistory.objects
+        .filter(product_id__in=product_ids, timestamp__lt=since)
+        .annotate(row_number=Window(
+            RowNumber(),
+            partition_by=F('product_id'),
+            order_by=[F('timestamp').desc(), F('id').desc()]
+        ))
+        .filter(row_number=1)
+        .values_list('product_id', 'price')
+    )
+    positions = {product_id: i for i, product_id in enumerate(product_ids)}
+    for product_id, price in rows:
+        prices[positions[product_id]] = float(price)
+    return prices
+
+
+def build_transitions(product_ids=None, since=None):
+    """
+    Vectorize logged history into offline RL transitions.
+
+    Row i of a product is one step: the state before its price change (the
+    previous row's price, days since the previous row, rows in the trailing
+    7 days), the logged change mapped to the nearest discrete action, the
+    environment's margin reward weighted by the units actually sold relative
+    to that product's average, and the state before row i + 1. A product's
+    last row is terminal.
+
+    Returns a dict of arrays plus the sorted ``product_ids`` covered, or None
+    when there is no history.
+    """
+    history = _load_history(product_ids, since)
+    n = len(history['product_id'])
+    if n < 2:
+        return None
+
+    ids, group = np.unique(history['product_id'], return_inverse=True)
+    products = _load_products(ids.tolist())
+    starts = np.r_[True, group[1:] != group[:-1]]
+    ends = np.r_[group[1:] != group[:-1], True]
+
+    price = history['price']
+    timestamp = history['timestamp']
+    change = history['change_percentage'] / 100
+
+    # Price before each change: the previous row, the last row before ``since``,
+    # or undone from the change itself. Clipping to the price bounds may have
+    # absorbed part of that change, so the reconstruction is clipped as well.
+    previous_price = np.r_[price[0], price[:-1]]
+    reconstructed = np.clip(
+        price[starts] / (1 + change[starts]), products['min_price'], products['max_price']
+    )
+    recorded = _prices_before(ids.tolist(), since)
+    previous_price[starts] = np.where(np.isnan(recorded), reconstructed, recorded)
+
+    gap_days = np.floor(np.r_[0.0, np.diff(timestamp)] / DAY_SECONDS)
+    # Rows of the same product in the 7 days before each row (exclusive)
+    key = group * 1e9 + (timestamp - timestamp.min())
+    recent = np.arange(n) - np.searchsorted(key, key - SALES_WINDOW_SECONDS, side='right')
+    days_since_last = np.where((recent > 0) & ~starts, gap_days, NO_SALE_DAYS)
+    sales_count = np.where(~starts, recent, 0).astype(np.float64)
+
+    states = np.stack([
+        previous_price,
+        products['base_price'][group],
+        products['stock_quantity'][group],
+        days_since_last,
+        sales_count / 7,
+    ], axis=1).astype(np.float32)
+
+    next_states = np.empty_like(states)
+    next_states[:-1] = states[1:]
+    next_states[ends] = states[ends]
+    next_states[ends, 0] = price[ends]
+
+    actions = np.abs(change[:, None] - PRICE_CHANGE_PERCENTAGES[None, :]).argmin(axis=1)
+
+    cost = products['cost_price'][group]
+    margin = (price - cost) / np.maximum(price, 1e-6)
+    mean_units = np.bincount(group, weights=history['units_sold']) / np.bincount(group)
+    demand = np.where(mean_units[group] > 0, history['units_sold'] / np.maximum(mean_units[group], 1e-6), 1.0)
+
+    return {
+        'observations': states,
+        'actions': actions.astype(np.int64),
+        'rewards': (margin * demand).astype(np.float32),
+        'next_observations': next_states,
+        'dones': ends.astype(np.float32),
+        'product_ids': ids,
+    }
+
+
+def fit_q_network(q_net, transitions, iterations=20, epochs=2, batch_size=1024,
+                  gamma=0.99, bc_weight=0.5, learning_rate=1e-3, seed=0):
+    """
+    Fitted Q-iteration with behaviour-cloning regularization, trained in place.
+
+    Each iteration freezes a copy of ``q_net`` to compute Bellman targets for
+    the whole dataset at once, then regresses ``q_net`` onto them for a few
+    epochs. The cross-entropy term keeps the greedy policy close to the
+    logged actions, which guards against overestimating actions the data
+    never took. Returns the final mean loss.
+    """
+    import copy
+    import torch
+    import torch.nn.functional as F
+
+    torch.manual_seed(seed)
+    generator = np.random.default_rng(seed)
+    obs = torch.as_tensor(transitions['observations'])
+    next_obs = torch.as_tensor(transitions['next_observations'])
+    actions = torch.as_tensor(transitions['actions'])
+    rewards = torch.as_tensor(transitions['rewards'])
+    not_done = 1.0 - torch.as_tensor(transitions['dones'])
+    optimizer = torch.optim.Adam(q_net.parameters(), lr=learning_rate)
+
+    loss_value = 0.0
+    for _ in range(iterations):
+        target_net = copy.deepcopy(q_net)
+        with torch.no_grad():
+            targets = rewards + gamma * not_done * target_net(next_obs).max(dim=1).values
+
+        for _ in range(epochs):
+            order = torch.as_tensor(generator.permutation(len(obs)))
+            losses = []
+            for start in range(0, len(obs), batch_size):
+                batch = order[start:start + batch_size]
+                q_values = q_net(obs[batch])
+                chosen = q_values.gather(1, actions[batch, None]).squeeze(1)
+                loss = F.smooth_l1_loss(chosen, targets[batch]) + bc_weight * F.cross_entropy(q_values, actions[batch])
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                losses.append(loss.item())
+            loss_value = float(np.mean(losses))
+    return loss_value
+
+
+def save_offline_models(source, product_ids, log_output=''):
+    """
+    Save ``source``'s weights as every product's DQN model through
+    ``PricingModelTrainer.save_model``, which also writes the NumPy export and
+    warm-start metadata. One DQN model is built per distinct set of tuned
+    hyperparameters; between products only its observation bounds change.
+    Records a successful TrainingSession per product. Returns the number saved.
+    """
+    from rl_pricing.models import TrainingSession
+    from rl_pricing.state import load_snapshots
+    from rl_pricing.trainer import DEFAULT_HYPERPARAMS, PricingModelTrainer, model_records
+
+    product_ids = [int(pid) for pid in product_ids]
+    snapshot = load_snapshots(product_ids)
+    records = model_records(product_ids, 'DQN')
+    weights = source.policy.state_dict()
+    models = {}
+    sessions = []
+    for i, product_id in enumerate(product_ids):
+        summary = {field: float(values[i]) for field, values in snapshot.items() if field != 'ids'}
+        hyperparameters = {**DEFAULT_HYPERPARAMS['DQN'], **records[product_id].hyperparameters}
+        trainer = PricingModelTrainer(product_id, algorithm='DQN')
+        trainer.env = trainer.create_env(snapshot=summary)
+
+        key = json.dumps(hyperparameters, sort_keys=True)
+        if key not in models:
+            models[key] = trainer.build_model(hyperparameters)
+            models[key].policy.load_state_dict(weights)
+        model = models[key]
+        # Price bounds are the only per-product part of the saved model
+        model.observation_space = model.policy.observation_space = trainer.env.observation_space
+        trainer.save_model(model, summary, hyperparameters=hyperparameters)
+        sessions.append(TrainingSession(
+            model=records[product_id],
+            completed_at=timezone.now(),
+            successful=True,
+            log_output=log_output
+        ))
+    TrainingSession.objects.bulk_create(sessions)
+    return len(sessions)
+
+
+def train_offline(product_ids=None, since=None, **fit_options):
+    """
+    Build transitions, fit one Q-network on all products' data and save it as
+    every listed product's DQN model. Returns a summary dict.
+    """
+    from rl_pricing.trainer import PricingModelTrainer
+
+    started = time.perf_counter()
+    transitions = build_transitions(product_ids, since)
+    if transitions is None:
+        return {'products': 0, 'transitions': 0, 'loss': None, 'seconds': time.perf_counter() - started}
+
+    ids = transitions['product_ids']
+    template = PricingModelTrainer(int(ids[0]), algorithm='DQN')
+    model = template.initialize_model()
+    loss = fit_q_network(model.q_net, transitions, **fit_options)
+    model.q_net_target.load_state_dict(model.q_net.state_dict())
+
+    count = len(transitions['actions'])
+    saved = save_offline_models(
+        model, ids, log_output=f"Offline fitted Q-iteration on {count} logged transitions, loss {loss:.4f}"
+    )
+    return {
+        'products': saved,
+        'transitions': count,
+        'loss': loss,
+        'seconds': time.perf_counter() - started,
+    }
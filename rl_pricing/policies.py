@@ -0,0 +1,137 @@
+import weakref
+from collections import namedtuple
+import numpy as np
+
+ACTIVATIONS = {
+    'ReLU': lambda x: np.maximum(x, 0),
+    'Tanh': np.tanh,
+}
+
+
+class MlpWeights(namedtuple('MlpWeights', ['layers', 'activation'])):
+    """Dense layers ``[(W, b), ...]`` of a greedy MLP policy, W shaped (in, out)"""
+
+    @property
+    def signature(self):
+        return (self.activation, tuple(W.shape for W, _ in self.layers))
+
+
+_weights_cache = weakref.WeakKeyDictionary()
+
+
+def extract_mlp(model):
+    """
+    Pull the greedy-action network out of an SB3 DQN or PPO ``MlpPolicy``.
+
+    DQN uses the Q-network, PPO the policy branch plus ``action_net``; in both
+    cases the greedy action is the argmax of the last layer. Returns None for
+    policies that are not a plain flatten + Linear/activation stack.
+    """
+    policy = model.policy
+    if hasattr(policy, 'q_net'):
+        extractor = policy.q_net.features_extractor
+        modules = list(policy.q_net.q_net)
+    else:
+        extractor = policy.pi_features_extractor
+        modules = list(policy.mlp_extractor.policy_net) + [policy.action_net]
+
+    if type(extractor).__name__ != 'FlattenExtractor':
+        return None
+
+    layers = []
+    activation = None
+    for module in modules:
+        name = type(module).__name__
+        if name == 'Linear':
+            layers.append((
+                module.weight.detach().cpu().numpy().T.astype(np.float32),
+                module.bias.detach().cpu().numpy().astype(np.float32),
+            ))
+        elif name in ACTIVATIONS and activation in (None, name):
+            activation = name
+        else:
+            return None
+    return MlpWeights(layers, activation or 'ReLU')
+
+
+def get_mlp_weights(model):
+    """``extract_mlp`` memoized per loaded model object"""
+    if isinstance(model, NumpyPolicy):
+        return model.weights
+    try:
+        return _weights_cache[model]
+    except KeyError:
+        weights = _weights_cache[model] = extract_mlp(model)
+        return weights
+
+
+def batched_greedy_actions(weights, observations):
+    """
+    Greedy actions for G same-shaped MLPs, one observation row each.
+
+    The G networks are stacked into (G, in, out) tensors so each layer is a
+    single batched matmul instead of G separate forward passes.
+    """
+    x = np.asarray(observations, dtype=np.float32)[:, None, :]
+    activation = ACTIVATIONS[weights[0].activation]
+    n_layers = len(weights[0].layers)
+    for i in range(n_layers):
+        W = np.stack([w.layers[i][0] for w in weights])
+        b = np.stack([w.layers[i][1] for w in weights])[:, None, :]
+        x = np.matmul(x, W) + b
+        if i < n_layers - 1:
+            x = activation(x)
+    return x[:, 0, :].argmax(axis=1)
+
+
+def export_policy(model, path):
+    """
+    Write the greedy network of an SB3 model to a compact ``.npz``.
+
+    Returns the path, or None if the policy cannot be expressed as a plain MLP.
+    """
+    weights = extract_mlp(model)
+    if weights is None:
+        return None
+
+    arrays = {}
+    for i, (W, b) in enumerate(weights.layers):
+        arrays[f'W{i}'] = W
+        arrays[f'b{i}'] = b
+    with open(path, 'wb') as f:
+        np.savez(f, activation=np.array(weights.activation), **arrays)
+    return path
+
+
+class NumpyPolicy:
+    """
+    Torch-free stand-in for a trained SB3 model, loaded from ``export_policy``
+    output. ``predict`` matches ``model.predict(obs, deterministic=True)``.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_layers = sum(1 for name in data.files if name.startswith('W'))
+            layers = [(data[f'W{i}'], data[f'b{i}']) for i in range(n_layers)]
+            return cls(MlpWeights(layers, str(data['activation'])))
+
+    def forward(self, observations):
+        x = np.asarray(observations, dtype=np.float32)
+        activation = ACTIVATIONS[self.weights.activation]
+        n_layers = len(self.weights.layers)
+        for i, (W, b) in enumerate(self.weights.layers):
+            x = x @ W + b
+            if i < n_layers - 1:
+                x = activation(x)
+        return x
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        observation = np.asarray(observation, dtype=np.float32)
+        actions = self.forward(observation.reshape(-1, observation.shape[-1])).argmax(axis=1)
+        if observation.ndim == 1:
+            return actions[0], None
+        return actions, None
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+# ReplayBuffer arrays persisted per transition (next_observations is absent
+# when the buffer was built with optimize_memory_usage)
+BUFFER_FIELDS = ['observations', 'next_observations', 'actions', 'rewards', 'dones', 'timeouts']
+META_FILE = 'meta.json'
+
+
+def _directory_size(path):
+    # Another worker may swap or delete the buffer while it is measured
+    size = 0
+    for entry in os.scandir(path):
+        try:
+            if entry.is_file():
+                size += entry.stat().st_size
+        except FileNotFoundError:
+            continue
+    return size
+
+
+def save_replay_buffer(buffer, path, max_transitions=None):
+    """
+    Write a ReplayBuffer as one .npy file per field, oldest transition first,
+    keeping at most ``max_transitions`` of the newest ones. The directory is
+    swapped in atomically so readers never see a half-written buffer.
+    Returns the number of transitions saved.
+    """
+    size = buffer.size()
+    rows = min(size, max_transitions or size)
+    if rows == 0:
+        return 0
+
+    if buffer.full:
+        # Unroll the ring so row 0 is the oldest transition
+        order = np.concatenate([np.arange(buffer.pos, buffer.buffer_size), np.arange(buffer.pos)])
+    else:
+        order = np.arange(buffer.pos)
+    order = order[-rows:]
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    fields = [field for field in BUFFER_FIELDS if getattr(buffer, field, None) is not None]
+    for field in fields:
+        np.save(os.path.join(tmp_path, f"{field}.npy"), getattr(buffer, field)[order])
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump({'transitions': int(rows), 'fields': fields, 'saved_at': time.time()}, f)
+
+    # Mapped files of the old buffer stay valid until their readers close them
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return int(rows)
+
+
+def load_replay_buffer(buffer, path):
+    """
+    Restore a buffer saved by ``save_replay_buffer`` into ``buffer``.
+
+    A saved buffer that fills ``buffer`` completely is memory-mapped
+    copy-on-write, so pages are only read as training samples them and new
+    transitions never touch the file. Smaller ones are copied in. Returns the
+    number of transitions loaded, 0 when nothing usable was found.
+    """
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return 0
+
+    rows = meta['transitions']
+    if rows > buffer.buffer_size:
+        return 0
+    arrays = {}
+    for field in meta['fields']:
+        target = getattr(buffer, field, None)
+        array = np.load(os.path.join(path, f"{field}.npy"), mmap_mode='c')
+        if target is None or array.shape[1:] != target.shape[1:] or array.dtype != target.dtype:
+            return 0
+        arrays[field] = array
+
+    for field, array in arrays.items():
+        if rows == buffer.buffer_size:
+            setattr(buffer, field, array)
+        else:
+            getattr(buffer, field)[:rows] = array
+    buffer.pos = rows % buffer.buffer_size
+    buffer.full = rows == buffer.buffer_size
+    return rows
+
+
+def enforce_disk_budget(root, max_bytes, suffix='_replay'):
+    """
+    Delete the oldest saved replay buffers under ``root`` (first in, first
+    out) until they fit in ``max_bytes``. The newest buffer is always kept.
+    Buffers that disappear while the directory is scanned are skipped.
+    Returns the paths removed.
+    """
+    buffers = []
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.name.endswith(suffix):
+            meta_path = os.path.join(entry.path, META_FILE)
+            try:
+                saved_at = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+                buffers.append((saved_at, entry.path, _directory_size(entry.path)))
+            except FileNotFoundError:
+                # Swapped out or removed by a concurrent save
+                continue
+
+    buffers.sort()
+    total = sum(size for _, _, size in buffers)
+    removed = []
+    for _, path, size in buffers[:-1]:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path)
+    return removed
@@ -0,0 +1,56 @@
+# Pricing state shared by the Gym environments and the inference path. Kept
+# free of gymnasium/stable-baselines3 imports so web processes can build
+# observations without loading the RL stack.
+import numpy as np
+from django.utils import timezone
+from products.features import get_sales_features, state_sales_columns
+from products.models import Product
+
+# 0: -10%, 1: -5%, 2: no change, 3: +5%, 4: +10%
+PRICE_CHANGE_PERCENTAGES = np.array([-0.10, -0.05, 0.0, 0.05, 0.10])
+
+SNAPSHOT_FIELDS = ('current_price', 'base_price', 'cost_price', 'min_price', 'max_price', 'stock_quantity')
+
+
+def load_snapshots(product_ids):
+    """
+    Load prices and 7-day sales summaries for many products as NumPy arrays.
+
+    Runs two queries whatever the number of products. Arrays follow the order
+    of ``product_ids``.
+    """
+    product_ids = list(product_ids)
+    now = timezone.now()
+
+    products = {
+        row['id']: row
+        for row in Product.objects.filter(id__in=product_ids).values('id', *SNAPSHOT_FIELDS)
+    }
+    missing = set(product_ids) - set(products)
+    if missing:
+        raise Product.DoesNotExist(f"Products not found: {sorted(missing)}")
+
+    features = get_sales_features(product_ids)
+
+    snapshot = {'ids': np.array(product_ids, dtype=np.int64)}
+    for field in SNAPSHOT_FIELDS:
+        snapshot[field] = np.array([float(products[pid][field]) for pid in product_ids])
+
+    days_since_last, sales_count = np.array(
+        [state_sales_columns(features[pid], now) for pid in product_ids],
+        dtype=np.float64
+    ).reshape(-1, 2).T
+    snapshot['days_since_last'] = days_since_last
+    snapshot['sales_count'] = sales_count
+    return snapshot
+
+
+def snapshot_observations(snapshot, prices=None, sales_count=None, days_since_last=None):
+    """Build the (N, 5) observation matrix from a snapshot and optional live columns"""
+    return np.stack([
+        snapshot['current_price'] if prices is None else prices,
+        snapshot['base_price'],
+        snapshot['stock_quantity'],
+        snapshot['days_since_last'] if days_since_last is None else days_since_last,
+        (snapshot['sales_count'] if sales_count is None else sales_count) / 7
+    ], axis=1).astype(np.float32)
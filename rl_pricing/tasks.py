@@ -1,64 +1,98 @@
+import numpy as np
 from celery import shared_task
-from django.utils import timezone
-from rl_pricing.trainer import PricingModelTrainer
+from rl_pricing.state import PRICE_CHANGE_PERCENTAGES, load_snapshots, snapshot_observations
+from rl_pricing.inference import NO_DECISION, predict_actions
+from rl_pricing.training import train_products
+from rl_pricing.tuning import tune, tuning_groups
+from rl_pricing.model_cache import policy_cache
 from products.models import Product
+from products.price_updates import PriceDecision, apply_price_decisions
 
 @shared_task
-def retrain_rl_models(timesteps=1000):
+def retrain_rl_models(timesteps=1000, workers=None, chunk_size=1, incremental=False):
     """
     Retrain RL models for all products using the given timesteps.
+    Products are trained in parallel when ``workers`` (or RL_TRAINING_WORKERS) > 1.
+    With ``incremental`` existing models are warm-started on new experience only.
     """
-    products = Product.objects.filter(pricing_strategy='RL') 
-    for product in products:
-        try:
-            trainer = PricingModelTrainer(product.id)
-            trainer.train(total_timesteps=timesteps)
-            print(f"✅ Trained RL model for product {product.name}")
-        except Exception as e:
-            print(f"❌ Failed to train model for {product.name}: {e}")
+    products = dict(Product.objects.filter(pricing_strategy='RL').values_list('id', 'name'))
+    results = train_products(
+        list(products), timesteps=timesteps, workers=workers, chunk_size=chunk_size, incremental=incremental
+    )
+    failed = 0
+    for result in results:
+        name = products[result['product_id']]
+        if result['successful']:
+            print(f"✅ {result['mode'].capitalize()} training for product {name}: "
+                  f"{result['timesteps']} timesteps in {result['duration']:.1f}s")
+        else:
+            failed += 1
+            print(f"❌ Failed to train model for {name}: {result['error']}")
+    return f"Retrained {len(products) - failed}/{len(products)} RL models."
+
+@shared_task
+def tune_rl_models(algorithm='DQN', scope='category', category_ids=None, sample_size=3, configs=9,
+                   min_timesteps=2000, max_timesteps=None, eta=3, workers=None, seed=0):
+    """
+    Tune hyperparameters with successive halving and store the best
+    configuration per category (or product) on its RLModel rows.
+    Like retrain_rl_models, ``workers`` > 1 needs a non-daemonic worker.
+    """
+    groups = tuning_groups(scope=scope, category_ids=category_ids, sample_size=sample_size, seed=seed)
+    results = tune(
+        groups, algorithm=algorithm, configs=configs, min_timesteps=min_timesteps,
+        max_timesteps=max_timesteps, eta=eta, workers=workers, seed=seed
+    )
+    tuned = 0
+    for result in results:
+        if result['score'] is None:
+            print(f"❌ Every configuration failed for {result['group']}")
+            continue
+        tuned += 1
+        print(f"✅ {result['group']}: mean reward {result['score']:.3f} with {result['config']}")
+    return f"Tuned {tuned}/{len(groups)} {algorithm} groups."
 
 @shared_task
-def update_product_prices():
+def update_product_prices(chunk_size=500):
     """
     Update prices for products based on their RL-trained models.
+    Products are processed in chunks: one snapshot query and one batched
+    policy forward pass per chunk.
     """
-    products = Product.objects.filter(pricing_strategy='RL') 
+    product_ids = list(Product.objects.filter(pricing_strategy='RL').values_list('id', flat=True))
 
-    for product in products:
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start:start + chunk_size]
         try:
-            trainer = PricingModelTrainer(product.id)
-            model = trainer.load_or_create_model()  
-
-           
-            env_state = [
-                float(product.current_price),
-                float(product.stock_quantity),
-            ]
-
-           
-            action, _ = model.predict(env_state, deterministic=True)
-
-           
-            change_percentage = (action - 2) * 2.5 
-
-            
-            new_price = float(product.current_price) * (1 + change_percentage / 100)
-            new_price = max(float(product.min_price), min(new_price, float(product.max_price)))
+            snapshot = load_snapshots(chunk)
+            actions = predict_actions(chunk, snapshot_observations(snapshot))
+        except Exception as e:
+            print(f"❌ Failed to predict prices for products {chunk[0]}-{chunk[-1]}: {e}")
+            continue
 
-           
-            product.current_price = new_price
-            product.last_price_update = timezone.now()
-            product.save()
+        # Products whose model failed keep their price this round
+        decided = actions != NO_DECISION
+        price_changes = PRICE_CHANGE_PERCENTAGES[actions[decided]]
+        new_prices = np.clip(
+            snapshot['current_price'][decided] * (1 + price_changes),
+            snapshot['min_price'][decided],
+            snapshot['max_price'][decided]
+        )
+        decided_ids = [product_id for product_id, ok in zip(chunk, decided) if ok]
 
-            
-            product.price_history.create(
-                price=new_price,
-                change_percentage=change_percentage,
+        try:
+            result = apply_price_decisions(
+                PriceDecision(product_id, new_price, price_change * 100)
+                for product_id, new_price, price_change in zip(decided_ids, new_prices, price_changes)
             )
-
-            print(f"✅ Updated price for {product.name}: {product.current_price:.2f}")
-
         except Exception as e:
-            print(f"❌ Failed to update price for {product.name}: {e}")
+            print(f"❌ Failed to save prices for products {chunk[0]}-{chunk[-1]}: {e}")
+            continue
+
+        print(
+            f"✅ Updated prices for {result['products']} products "
+            f"({result['rows_per_second']:.0f} rows/s)"
+        )
 
-    return "✅ All RL product prices updated."
+    stats = policy_cache.stats()
+    return f"✅ All RL product prices updated (model cache: {stats['hits']} hits, {stats['misses']} misses)."
@@ -1,3 +1,459 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from products.models import Product, ProductCategory, ProductPriceHistory
+from rl_pricing.environment import ProductPricingEnv
+from rl_pricing.models import RLModel, TrainingSession
+from rl_pricing.policies import NumpyPolicy, export_policy
+from rl_pricing.tuning import rung_budgets, sample_configs, select_survivors, tune
 
-# Create your tests here.
+
+class NumpyPolicyParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Test')
+        cls.product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100,
+            cost_price=60, stock_quantity=10, min_price=70, max_price=150
+        )
+
+    def assert_parity(self, model):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = export_policy(model, os.path.join(tmp, 'policy.npz'))
+            policy = NumpyPolicy.load(path)
+
+        rng = np.random.default_rng(0)
+        observations = np.column_stack([
+            rng.uniform(70, 150, 500),
+            rng.uniform(70, 150, 500),
+            rng.uniform(0, 100, 500),
+            rng.integers(0, 31, 500),
+            rng.uniform(0, 20, 500),
+        ]).astype(np.float32)
+
+        expected, _ = model.predict(observations, deterministic=True)
+        actions, _ = policy.predict(observations)
+        np.testing.assert_array_equal(actions, expected)
+
+        single, _ = policy.predict(observations[0])
+        self.assertEqual(single, expected[0])
+
+    def test_dqn_parity(self):
+        from stable_baselines3 import DQN
+
+        env = ProductPricingEnv(self.product.id, simulate=True)
+        model = DQN('MlpPolicy', env, learning_starts=50, seed=0)
+        model.learn(total_timesteps=200)
+        self.assert_parity(model)
+
+    def test_ppo_parity(self):
+        from stable_baselines3 import PPO
+
+        env = ProductPricingEnv(self.product.id, simulate=True)
+        model = PPO('MlpPolicy', env, n_steps=64, batch_size=32, seed=0)
+        model.learn(total_timesteps=128)
+        self.assert_parity(model)
+
+
+@override_settings(RL_INCREMENTAL_TIMESTEPS_PER_ROW=2, RL_INCREMENTAL_MIN_TIMESTEPS=5)
+class IncrementalTimestepsTests(TestCase):
+    def test_only_price_moves_and_sales_count_as_new_experience(self):
+        from rl_pricing.trainer import PricingModelTrainer
+
+        category = ProductCategory.objects.create(name='Test')
+        product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100,
+            cost_price=60, stock_quantity=10, min_price=70, max_price=150
+        )
+        model = RLModel.objects.create(product=product, algorithm='DQN', model_file='unused.zip')
+        TrainingSession.objects.create(
+            model=model, successful=True, completed_at=timezone.now() - timedelta(hours=1)
+        )
+        trainer = PricingModelTrainer(product.id)
+
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(product=product, price=100, change_percentage=0.0) for _ in range(50)
+        ])
+        self.assertEqual(trainer.incremental_timesteps(1000), 0)
+
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(product=product, price=105, change_percentage=5.0),
+            ProductPriceHistory(product=product, price=105, change_percentage=0.0, units_sold=3),
+            ProductPriceHistory(product=product, price=110, change_percentage=5.0, units_sold=1),
+        ])
+        self.assertEqual(trainer.incremental_timesteps(1000), 6)
+        self.assertEqual(trainer.incremental_timesteps(4), 4)
+
+    def test_ppo_warm_start_trains_whole_rollouts(self):
+        from rl_pricing.trainer import PricingModelTrainer
+
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        category = ProductCategory.objects.create(name='Test')
+        product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100,
+            cost_price=60, stock_quantity=10, min_price=70, max_price=150
+        )
+        trainer = PricingModelTrainer(product.id, algorithm='PPO')
+        model = trainer.get_model_record()
+        RLModel.objects.filter(pk=model.pk).update(hyperparameters={'n_steps': 64, 'batch_size': 32, 'n_epochs': 1})
+        trainer.train(total_timesteps=64)
+        TrainingSession.objects.create(model=model, successful=True, completed_at=timezone.now() - timedelta(days=10))
+        # Outside the 7-day sales window, so the snapshot does not drift
+        ProductPriceHistory.objects.create(
+            product=product, price=105, change_percentage=5.0, timestamp=timezone.now() - timedelta(days=8)
+        )
+
+        trainer.train(total_timesteps=1000, incremental=True)
+
+        # 5 timesteps of new experience, rounded up to one rollout
+        self.assertEqual((trainer.last_run['mode'], trainer.last_run['timesteps']), ('incremental', 64))
+        self.assertEqual(trainer.read_metadata()['num_timesteps'], 128)
+
+
+class OfflineTransitionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Test')
+        cls.products = [
+            Product.objects.create(
+                name=name, category=category, base_price=100, current_price=100,
+                cost_price=60, stock_quantity=10, min_price=70, max_price=150
+            )
+            for name in ('Widget', 'Gadget')
+        ]
+        now = timezone.now()
+        rows = [
+            (cls.products[0], 100, 0.0, 1, 3),
+            (cls.products[0], 105, 5.0, 2, 2),
+            (cls.products[0], 110, 4.76, 3, 1),
+            # Logged as -10% but pinned at max_price, so only part of it happened
+            (cls.products[1], 150, -10.0, 4, 1),
+        ]
+        ProductPriceHistory.objects.bulk_create([
+            ProductPriceHistory(
+                product=product, price=price, change_percentage=change,
+                units_sold=units, timestamp=now - timedelta(hours=hours_ago)
+            )
+            for product, price, change, units, hours_ago in rows
+        ])
+
+    def test_build_transitions_shapes_and_rewards(self):
+        from rl_pricing.offline import build_transitions
+
+        transitions = build_transitions()
+
+        self.assertEqual(transitions['observations'].shape, (4, 5))
+        self.assertEqual(transitions['next_observations'].shape, (4, 5))
+        self.assertEqual(transitions['product_ids'].tolist(), [product.id for product in self.products])
+        self.assertEqual(transitions['actions'].tolist(), [2, 3, 3, 0])
+        self.assertEqual(transitions['dones'].tolist(), [0, 0, 1, 1])
+        np.testing.assert_allclose(transitions['observations'][:, 0], [100, 100, 105, 150])
+        np.testing.assert_allclose(transitions['next_observations'][:, 0], [100, 105, 110, 150])
+        # Margin times units sold relative to the product's average (2 and 4)
+        np.testing.assert_allclose(
+            transitions['rewards'], [0.4 * 0.5, 45 / 105, 50 / 110 * 1.5, 0.6], rtol=1e-5
+        )
+
+    def test_fit_q_network_on_tiny_history(self):
+        import torch
+        from rl_pricing.offline import build_transitions, fit_q_network
+
+        transitions = build_transitions()
+        q_net = torch.nn.Sequential(torch.nn.Linear(5, 16), torch.nn.ReLU(), torch.nn.Linear(16, 5))
+        loss = fit_q_network(q_net, transitions, iterations=3, epochs=2, batch_size=2)
+
+        self.assertTrue(np.isfinite(loss))
+        self.assertEqual(q_net(torch.as_tensor(transitions['observations'])).shape, (4, 5))
+
+    def test_history_is_loaded_in_chunks(self):
+        from rl_pricing.offline import _load_history
+
+        history = _load_history(chunk_size=3)
+
+        self.assertEqual(history['product_id'].tolist(), [self.products[0].id] * 3 + [self.products[1].id])
+        self.assertEqual(history['price'].tolist(), [100, 105, 110, 150])
+        self.assertEqual(history['units_sold'].tolist(), [1, 2, 3, 4])
+        self.assertTrue(np.all(np.diff(history['timestamp'][:3]) > 0))
+        self.assertEqual(len(_load_history(since=timezone.now())['timestamp']), 0)
+
+    def test_save_offline_models_shares_one_model(self):
+        from stable_baselines3 import DQN
+        from rl_pricing.offline import save_offline_models
+        from rl_pricing.trainer import PricingModelTrainer
+
+        cwd = os.getcwd()
+        workdir = tempfile.TemporaryDirectory()
+        os.chdir(workdir.name)
+        self.addCleanup(workdir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        Product.objects.filter(id=self.products[1].id).update(max_price=200)
+        ids = [product.id for product in self.products]
+        source = PricingModelTrainer(ids[0]).initialize_model()
+
+        self.assertEqual(save_offline_models(source, ids, log_output='offline'), 2)
+
+        self.assertEqual(RLModel.objects.filter(product_id__in=ids, algorithm='DQN').count(), 2)
+        self.assertEqual(TrainingSession.objects.filter(log_output='offline', successful=True).count(), 2)
+        highs = [DQN.load(PricingModelTrainer(pid).model_zip_path).observation_space.high[0] for pid in ids]
+        self.assertEqual(highs, [150, 200])
+        saved = DQN.load(PricingModelTrainer(ids[1]).model_zip_path)
+        for name, tensor in source.policy.state_dict().items():
+            np.testing.assert_array_equal(saved.policy.state_dict()[name].numpy(), tensor.numpy())
+
+
+class PriceUpdateIsolationTests(TestCase):
+    def setUp(self):
+        from rl_pricing.model_cache import policy_cache
+
+        # Model files are written relative to the working directory
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.TemporaryDirectory()
+        os.chdir(self.workdir.name)
+        self.addCleanup(self.workdir.cleanup)
+        self.addCleanup(os.chdir, self.cwd)
+        policy_cache.clear()
+        self.addCleanup(policy_cache.clear)
+
+    def test_broken_model_only_skips_its_own_product(self):
+        from rl_pricing.tasks import update_product_prices
+        from rl_pricing.trainer import PricingModelTrainer
+
+        category = ProductCategory.objects.create(name='Test')
+        products = [
+            Product.objects.create(
+                name=f'Widget {i}', category=category, base_price=100, current_price=100, cost_price=60,
+                stock_quantity=10, min_price=70, max_price=150, pricing_strategy='RL'
+            )
+            for i in range(3)
+        ]
+        for product in products:
+            PricingModelTrainer(product.id).load_or_create_model()
+        broken = PricingModelTrainer(products[1].id)
+        for path in (broken.model_zip_path, broken.policy_path):
+            with open(path, 'wb') as f:
+                f.write(b'not a model')
+
+        update_product_prices()
+
+        self.assertEqual(
+            sorted(ProductPriceHistory.objects.values_list('product_id', flat=True)),
+            [products[0].id, products[2].id]
+        )
+
+
+class SuccessiveHalvingTests(SimpleTestCase):
+    def test_rung_budgets(self):
+        self.assertEqual(rung_budgets(9, 100, 3), [(9, 100), (3, 300), (1, 900)])
+        self.assertEqual(rung_budgets(10, 100, 3), [(10, 100), (4, 300), (2, 900), (1, 2700)])
+        # The next rung would train past the cap
+        self.assertEqual(rung_budgets(9, 100, 3, max_timesteps=500), [(9, 100), (3, 300)])
+        self.assertEqual(rung_budgets(1, 100, 3), [(1, 100)])
+
+    def test_sample_configs(self):
+        space = {'gamma': [0.9, 0.99], 'learning_rate': [1e-4, 3e-4, 1e-3]}
+
+        self.assertEqual(len(sample_configs(space, 10)), 6)
+        configs = sample_configs(space, 4, seed=3)
+        self.assertEqual(len(configs), 4)
+        self.assertEqual(len({tuple(sorted(config.items())) for config in configs}), 4)
+        self.assertEqual(configs, sample_configs(space, 4, seed=3))
+        for config in configs:
+            self.assertIn(config['gamma'], space['gamma'])
+            self.assertIn(config['learning_rate'], space['learning_rate'])
+
+    def test_select_survivors(self):
+        scores = {0: 1.5, 1: -float('inf'), 2: 4.0, 3: 2.0}
+
+        self.assertEqual(select_survivors([0, 1, 2, 3], scores, 2), [2, 3])
+        self.assertEqual(select_survivors([0, 1], scores, 2), [0, 1])
+
+    def test_tune_without_groups(self):
+        self.assertEqual(list(tune({})), [])
+
+
+class ReplayBufferPersistenceTests(SimpleTestCase):
+    def make_buffer(self, size):
+        from gymnasium import spaces
+        from stable_baselines3.common.buffers import ReplayBuffer
+
+        return ReplayBuffer(
+            size, spaces.Box(low=-1, high=1, shape=(3,), dtype=np.float32), spaces.Discrete(4), device='cpu'
+        )
+
+    def fill(self, buffer, count):
+        for i in range(count):
+            obs = np.full((1, 3), i, dtype=np.float32)
+            buffer.add(obs, obs + 1, np.array([i % 4]), np.array([float(i)]), np.array([False]), [{}])
+
+    def test_round_trip(self):
+        from rl_pricing.replay import load_replay_buffer, save_replay_buffer
+
+        source = self.make_buffer(8)
+        self.fill(source, 11)  # Wraps the ring: transitions 3..10 remain
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'product_1_replay')
+            self.assertEqual(save_replay_buffer(source, path), 8)
+
+            # Same capacity: memory-mapped, oldest transition first
+            mapped = self.make_buffer(8)
+            self.assertEqual(load_replay_buffer(mapped, path), 8)
+            self.assertTrue(mapped.full)
+            self.assertEqual(mapped.rewards[:, 0].tolist(), [float(i) for i in range(3, 11)])
+            np.testing.assert_array_equal(mapped.next_observations, mapped.observations + 1)
+
+            # Larger capacity: copied in, new transitions append after the saved ones
+            copied = self.make_buffer(16)
+            self.assertEqual(load_replay_buffer(copied, path), 8)
+            self.assertEqual((copied.pos, copied.full), (8, False))
+            self.assertEqual(copied.actions[:8, 0, 0].tolist(), [i % 4 for i in range(3, 11)])
+
+            # Too small to hold the saved transitions
+            self.assertEqual(load_replay_buffer(self.make_buffer(4), path), 0)
+            self.assertEqual(load_replay_buffer(self.make_buffer(8), os.path.join(root, 'missing')), 0)
+
+            self.assertEqual(save_replay_buffer(source, path, max_transitions=5), 5)
+            trimmed = self.make_buffer(8)
+            load_replay_buffer(trimmed, path)
+            self.assertEqual(trimmed.rewards[:5, 0].tolist(), [float(i) for i in range(6, 11)])
+
+
+class TrainingTelemetryTests(TestCase):
+    def test_ring_buffer_keeps_the_latest_window(self):
+        from rl_pricing.callbacks import RingBuffer
+
+        buffer = RingBuffer(4)
+        self.assertIsNone(buffer.mean())
+        buffer.extend([1, 2])
+        self.assertEqual(buffer.mean(), 1.5)
+        buffer.extend([3, 4, 5])
+        self.assertEqual(buffer.mean(), 3.5)
+        # Longer than the window: only its tail is kept
+        buffer.extend(range(100))
+        self.assertEqual(buffer.mean(), 97.5)
+
+    def test_time_split_excludes_telemetry_writes(self):
+        from unittest import mock
+        from django.db import connection
+        from rl_pricing.callbacks import TrainingMetricsCallback
+
+        category = ProductCategory.objects.create(name='Test')
+        product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100, cost_price=60,
+            stock_quantity=10, min_price=70, max_price=150
+        )
+        session = TrainingSession.objects.create(model=RLModel.objects.create(product=product, model_file='x.zip'))
+        clock = [0.0]
+
+        def slow_query(execute, sql, params, many, context):
+            clock[0] += 2.0
+            return execute(sql, params, many, context)
+
+        callback = TrainingMetricsCallback(session=session, interval=3600)
+        with mock.patch('rl_pricing.callbacks.time.perf_counter', lambda: clock[0]), \
+                connection.execute_wrapper(callback.time_query), connection.execute_wrapper(slow_query):
+            callback._on_training_start()
+            callback._on_rollout_start()
+            clock[0] += 1.0
+            Product.objects.count()  # 2s of DB time inside the rollout
+            callback.flush()  # 2s telemetry write, not DB time
+            callback._on_rollout_end()
+            clock[0] += 4.0  # gradient updates
+            callback._on_rollout_start()
+            callback._on_training_end()
+
+        metrics = callback.metrics()
+        self.assertEqual(metrics['env_seconds'], 1.0)
+        self.assertEqual(metrics['db_seconds'], 2.0)
+        self.assertEqual(metrics['learner_seconds'], 4.0)
+        self.assertEqual(metrics['telemetry_seconds'], 4.0)
+        self.assertEqual(metrics['wall_seconds'], 9.0)
+
+    def test_failed_run_keeps_flushed_metrics(self):
+        from unittest import mock
+        from rl_pricing.callbacks import TrainingMetricsCallback
+        from rl_pricing.trainer import PricingModelTrainer
+        from rl_pricing.training import train_product
+
+        category = ProductCategory.objects.create(name='Test')
+        product = Product.objects.create(
+            name='Widget', category=category, base_price=100, current_price=100, cost_price=60,
+            stock_quantity=10, min_price=70, max_price=150, pricing_strategy='RL'
+        )
+        flushed = {**TrainingMetricsCallback().metrics(), 'timesteps': 150}
+
+        def failing_train(trainer, total_timesteps, incremental, session):
+            trainer.last_run = {'mode': 'incremental', 'timesteps': 200, 'reason': None, 'metrics': {}}
+            session.metrics = flushed
+            raise RuntimeError('diverged')
+
+        with mock.patch.object(PricingModelTrainer, 'train', failing_train):
+            result = train_product(product.id, incremental=True)
+
+        self.assertFalse(result['successful'])
+        session = TrainingSession.objects.get(model__product=product)
+        self.assertFalse(session.successful)
+        self.assertEqual(session.metrics['timesteps'], 150)
+        self.assertIn('RuntimeError: diverged', session.log_output)
+
+
+class StartupImportTests(SimpleTestCase):
+    """django.setup() plus URL loading must stay cheap and never pull in the RL stack"""
+
+    HEAVY_MODULES = ['torch', 'stable_baselines3', 'gymnasium', 'rl_pricing.trainer', 'rl_pricing.environment']
+    SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+    def test_startup_skips_rl_stack_and_fits_budget(self):
+        result = subprocess.run(
+            [sys.executable, '-c', self.SCRIPT % self.HEAVY_MODULES],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'pricing_api.settings'},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(report['loaded'], [])
+        budget = getattr(settings, 'STARTUP_IMPORT_BUDGET_SECONDS', 2.0)
+        self.assertLess(report['seconds'], budget)
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    def test_regressions_respect_direction_and_threshold(self):
+        from rl_pricing.benchmarks import compare, metric
+
+        baseline = {'metrics': {
+            'train.dqn': metric(1000, 'steps/s', 'higher'),
+            'predict.p99_ms': metric(10, 'ms', 'lower'),
+            'update.100': metric(2, 's', 'lower'),
+        }}
+        report = {'metrics': {
+            'train.dqn': metric(850, 'steps/s', 'higher'),
+            'predict.p99_ms': metric(10.5, 'ms', 'lower'),
+            'update.100': metric(1, 's', 'lower'),
+            'new.metric': metric(1, 's', 'lower'),
+        }}
+
+        regressions = compare(report, baseline, threshold=10)
+        self.assertEqual([name for name, *_ in regressions], ['train.dqn'])
+        self.assertAlmostEqual(regressions[0][3], -15.0)
@@ -1,26 +1,73 @@
+import json
+import math
 import os
-import numpy as np
-from stable_baselines3 import DQN, PPO
-from stable_baselines3.common.callbacks import BaseCallback
-from stable_baselines3.common.monitor import Monitor
-from rl_pricing.environment import ProductPricingEnv
-from products.models import Product
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from rl_pricing.state import PRICE_CHANGE_PERCENTAGES, load_snapshots, snapshot_observations
+from rl_pricing.model_cache import policy_cache
+from rl_pricing.policies import export_policy
+from rl_pricing.replay import enforce_disk_budget, load_replay_buffer, save_replay_buffer
+from rl_pricing.models import RLModel, TrainingSession
+from products.models import Product, ProductPriceHistory
+
+# Snapshot columns compared against the last training run to detect drift
+DRIFT_FIELDS = ['base_price', 'cost_price', 'sales_count']
+
+# Used for every product unless its RLModel stores tuned overrides (tune_rl_models)
+DEFAULT_HYPERPARAMS = {
+    'DQN': {
+        'learning_rate': 1e-3,
+        'buffer_size': 10000,
+        'learning_starts': 1000,
+        'batch_size': 32,
+        'tau': 1.0,
+        'gamma': 0.99,
+        'train_freq': 4,
+        'gradient_steps': 1,
+        'target_update_interval': 1000,
+    },
+    'PPO': {
+        'learning_rate': 3e-4,
+        'n_steps': 2048,
+        'batch_size': 64,
+        'n_epochs': 10,
+        'gamma': 0.99,
+        'gae_lambda': 0.95,
+        'clip_range': 0.2,
+        'ent_coef': 0.0,
+    },
+}
+
+
+def model_records(product_ids, algorithm):
+    """RLModel rows of many products keyed by product id, bulk-creating missing ones"""
+    records = {
+        record.product_id: record
+        for record in RLModel.objects.filter(product_id__in=product_ids, algorithm=algorithm)
+    }
+    missing = [product_id for product_id in product_ids if product_id not in records]
+    if missing:
+        RLModel.objects.bulk_create([
+            RLModel(
+                product_id=product_id,
+                algorithm=algorithm,
+                model_file=PricingModelTrainer(product_id, algorithm=algorithm).model_zip_path
+            )
+            for product_id in missing
+        ], ignore_conflicts=True)
+        records.update(
+            (record.product_id, record)
+            for record in RLModel.objects.filter(product_id__in=missing, algorithm=algorithm)
+        )
+    return records
 
-class TrainLoggerCallback(BaseCallback):
-    def __init__(self, verbose=0):
-        super(TrainLoggerCallback, self).__init__(verbose)
-        self.rewards = []
-    
-    def _on_step(self) -> bool:
-        reward = self.locals.get('rewards', [0])[0]
-        self.rewards.append(reward)
-        
-        if self.num_timesteps % 1000 == 0:
-            avg_reward = np.mean(self.rewards[-100:])
-            print(f"Timestep: {self.num_timesteps}, Avg Reward: {avg_reward:.2f}")
-        return True
 
 class PricingModelTrainer:
+    # Passed explicitly so a warm start can tell when the architecture changed
+    POLICY_KWARGS = {'net_arch': [64, 64]}
+
     def __init__(self, product_id, algorithm='DQN'):
         self.product_id = product_id
         self.algorithm = algorithm
@@ -28,33 +75,60 @@ class PricingModelTrainer:
         self.env = None
         self.model_path = f"rl_pricing/models/product_{product_id}"
         self.model_zip_path = f"{self.model_path}.zip"
+        self.policy_path = f"{self.model_path}.npz"
+        self.metadata_path = f"{self.model_path}.json"
+        self.replay_path = f"{self.model_path}_replay"
+        # What the last train() call did: mode, timesteps, fallback reason and metrics
+        self.last_run = None
+        # TrainingSession that receives live training metrics, if any
+        self.session = None
+        self.callback = None
         
         os.makedirs("rl_pricing/models", exist_ok=True)
     
-    def create_env(self):
-        env = ProductPricingEnv(self.product_id)
+    def create_env(self, simulate=True, snapshot=None):
+        # Training and prediction run against an in-memory snapshot so they
+        # never write to the live product or its price history
+        from stable_baselines3.common.monitor import Monitor
+        from rl_pricing.environment import ProductPricingEnv
+
+        env = ProductPricingEnv(self.product_id, simulate=simulate, snapshot=snapshot)
         env = Monitor(env)
         return env
     
+    def get_model_record(self):
+        """RLModel row tracking this product's model file (created on first use)"""
+        rl_model, _ = RLModel.objects.get_or_create(
+            product_id=self.product_id,
+            algorithm=self.algorithm,
+            defaults={'model_file': self.model_zip_path}
+        )
+        return rl_model
+    
     def model_exists(self):
         return os.path.exists(self.model_zip_path)
     
+    def hyperparameters(self):
+        """Default hyperparameters for the algorithm, with the RLModel's tuned overrides applied"""
+        tuned = (
+            RLModel.objects
+            .filter(product_id=self.product_id, algorithm=self.algorithm)
+            .values_list('hyperparameters', flat=True)
+            .first()
+        )
+        return {**DEFAULT_HYPERPARAMS[self.algorithm], **(tuned or {})}
+    
+    def build_model(self, hyperparameters, verbose=0):
+        """A fresh SB3 model on ``self.env`` with the given hyperparameters"""
+        from stable_baselines3 import DQN, PPO
+
+        model_class = DQN if self.algorithm == 'DQN' else PPO
+        return model_class('MlpPolicy', self.env, verbose=verbose,
+                           policy_kwargs=self.POLICY_KWARGS, **hyperparameters)
+    
     def initialize_model(self):
         self.env = self.create_env()
-        
-        if self.algorithm == 'DQN':
-            model = DQN('MlpPolicy', self.env, verbose=0,
-                        learning_rate=1e-3,
-                        buffer_size=10000,
-                        learning_starts=1000,
-                        batch_size=32)
-        elif self.algorithm == 'PPO':
-            model = PPO('MlpPolicy', self.env, verbose=0,
-                        learning_rate=3e-4,
-                        n_steps=2048,
-                        batch_size=64)
-        
-        return model
+        return self.build_model(self.hyperparameters())
     
     def load_or_create_model(self):
         if self.model_exists():
@@ -62,56 +136,219 @@ class PricingModelTrainer:
         else:
             print(f"No existing model for product {self.product_id}, creating new model...")
             model = self.initialize_model()
-            model.save(self.model_path)
+            self.save_model(model)
+            self.model = model
             return model
     
-    def train(self, total_timesteps=10000):
-        self.env = self.create_env()
+    def read_metadata(self):
+        """Sidecar written next to the model by save_model, or None"""
+        try:
+            with open(self.metadata_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def snapshot_summary(self):
+        snapshot = load_snapshots([self.product_id])
+        return {field: float(values[0]) for field, values in snapshot.items() if field != 'ids'}
+    
+    def warm_start_blocker(self, summary):
+        """Why the saved model cannot be trained further, or None when it can"""
+        metadata = self.read_metadata()
+        if not self.model_exists() or metadata is None:
+            return "no saved model metadata"
+        if metadata.get('algorithm') != self.algorithm:
+            return f"algorithm changed from {metadata.get('algorithm')} to {self.algorithm}"
+        if metadata.get('policy_kwargs') != self.POLICY_KWARGS:
+            return "policy architecture changed"
+        # Models saved before tuning existed were trained with the defaults
+        if metadata.get('hyperparameters', DEFAULT_HYPERPARAMS[self.algorithm]) != self.hyperparameters():
+            return "hyperparameters changed"
+
+        previous = metadata.get('snapshot', {})
+        # Price bounds define the observation space, so they must match exactly
+        for field in ('min_price', 'max_price'):
+            if previous.get(field) != summary[field]:
+                return f"{field} changed, observation space differs"
+
+        threshold = getattr(settings, 'RL_DRIFT_THRESHOLD', 0.5)
+        for field in DRIFT_FIELDS:
+            old, new = previous.get(field, 0.0), summary[field]
+            if abs(new - old) / max(abs(old), 1.0) > threshold:
+                return f"{field} drifted from {old:g} to {new:g}"
+        return None
+    
+    def incremental_timesteps(self, total_timesteps):
+        """
+        Timesteps worth of new experience: history rows logged since the last
+        successful TrainingSession, scaled and capped at ``total_timesteps``.
+        PPO warm starts still train at least one full rollout (``n_steps``),
+        see ``train_incremental``.
+        Only rows with a price move or a sale count; the 15-minute price
+        update also logs "no change" rows that teach the agent nothing new.
+        """
+        last_session = (
+            TrainingSession.objects
+            .filter(model__product_id=self.product_id, model__algorithm=self.algorithm, successful=True)
+            .exclude(completed_at=None)
+            .order_by('-completed_at')
+            .first()
+        )
+        if last_session is None:
+            return total_timesteps
+
+        new_rows = ProductPriceHistory.objects.filter(
+            Q(units_sold__gt=0) | ~Q(change_percentage=0),
+            product_id=self.product_id, timestamp__gt=last_session.completed_at
+        ).count()
+        if new_rows == 0:
+            return 0
+        per_row = getattr(settings, 'RL_INCREMENTAL_TIMESTEPS_PER_ROW', 2)
+        minimum = getattr(settings, 'RL_INCREMENTAL_MIN_TIMESTEPS', 200)
+        return min(total_timesteps, max(minimum, new_rows * per_row))
+    
+    def train(self, total_timesteps=10000, incremental=False, session=None):
+        """
+        Train and save the model. With ``incremental=True`` the saved model is
+        loaded and trained further on just the experience gathered since the
+        last successful session; it falls back to training from scratch when
+        there is no usable model, or the algorithm, architecture or product
+        data changed too much. Rolling metrics are written to ``session``
+        while training runs.
+        """
+        self.session = session
+        summary = self.snapshot_summary()
+        reason = None
+        if incremental:
+            reason = self.warm_start_blocker(summary)
+            if reason is None:
+                return self.train_incremental(total_timesteps, summary)
+            print(f"Full retrain for product {self.product_id}: {reason}")
         
-        if self.algorithm == 'DQN':
-            model = DQN('MlpPolicy', self.env, verbose=1,
-                        learning_rate=1e-3,
-                        buffer_size=10000,
-                        learning_starts=1000,
-                        batch_size=32,
-                        tau=1.0,
-                        gamma=0.99,
-                        train_freq=4,
-                        gradient_steps=1,
-                        target_update_interval=1000)
-        elif self.algorithm == 'PPO':
-            model = PPO('MlpPolicy', self.env, verbose=1,
-                        learning_rate=3e-4,
-                        n_steps=2048,
-                        batch_size=64,
-                        n_epochs=10,
-                        gamma=0.99,
-                        gae_lambda=0.95,
-                        clip_range=0.2,
-                        ent_coef=0.0)
+        model = self.train_full(total_timesteps, summary)
+        self.last_run = {
+            'mode': 'full', 'timesteps': total_timesteps, 'reason': reason, 'metrics': self.callback.metrics()
+        }
+        return model
+    
+    def training_callback(self):
+        from rl_pricing.callbacks import TrainingMetricsCallback
+
+        self.callback = TrainingMetricsCallback(session=self.session, verbose=1)
+        return self.callback
+    
+    def train_incremental(self, total_timesteps, summary):
+        from stable_baselines3 import DQN, PPO
+
+        timesteps = self.incremental_timesteps(total_timesteps)
+        self.last_run = {
+            'mode': 'incremental' if timesteps else 'skipped', 'timesteps': timesteps, 'reason': None, 'metrics': {}
+        }
+        if timesteps == 0:
+            self.model = self.load_model()
+            return self.model
+
+        self.env = self.create_env()
+        model_class = DQN if self.algorithm == 'DQN' else PPO
+        model = model_class.load(self.model_zip_path, env=self.env)
+        self.load_replay_buffer(model)
+        if hasattr(model, 'n_steps'):
+            # PPO only learns from whole rollouts, so learn() would round a
+            # small budget up to n_steps anyway; make that the recorded budget
+            rollout = model.n_steps * model.n_envs
+            timesteps = math.ceil(timesteps / rollout) * rollout
+            self.last_run['timesteps'] = timesteps
+        callback = self.training_callback()
+        with connection.execute_wrapper(callback.time_query):
+            model.learn(total_timesteps=timesteps, callback=callback, reset_num_timesteps=False)
+        self.last_run['metrics'] = callback.metrics()
+        self.save_model(model, summary)
+        self.model = model
+        return model
+    
+    def train_full(self, total_timesteps, summary):
+        self.env = self.create_env()
+        model = self.build_model(self.hyperparameters(), verbose=1)
         
-        callback = TrainLoggerCallback()
-        model.learn(total_timesteps=total_timesteps, callback=callback)
-        model.save(self.model_path)
+        callback = self.training_callback()
+        with connection.execute_wrapper(callback.time_query):
+            model.learn(total_timesteps=total_timesteps, callback=callback)
+        self.save_model(model, summary)
         self.model = model
         return model
     
+    def save_model(self, model, summary=None, hyperparameters=None):
+        """
+        Save the SB3 model, its torch-free NumPy export and the metadata used
+        for warm starts, and drop stale cache entries. ``hyperparameters``
+        saves a lookup when the caller already resolved them.
+        """
+        model.save(self.model_path)
+        export_policy(model, self.policy_path)
+        metadata = {
+            'algorithm': self.algorithm,
+            'policy_kwargs': self.POLICY_KWARGS,
+            'hyperparameters': hyperparameters or self.hyperparameters(),
+            'num_timesteps': int(model.num_timesteps),
+            'saved_at': timezone.now().isoformat(),
+            'snapshot': summary or self.snapshot_summary(),
+        }
+        with open(self.metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        self.save_replay_buffer(model)
+        policy_cache.invalidate(self.product_id, self.algorithm)
+    
+    def save_replay_buffer(self, model):
+        """Persist a DQN replay buffer next to the model, within the shared disk budget"""
+        if not getattr(settings, 'RL_REPLAY_BUFFERS', True) or getattr(model, 'replay_buffer', None) is None:
+            return 0
+        saved = save_replay_buffer(
+            model.replay_buffer,
+            self.replay_path,
+            max_transitions=getattr(settings, 'RL_REPLAY_BUFFER_MAX_TRANSITIONS', 10000)
+        )
+        if saved:
+            budget = getattr(settings, 'RL_REPLAY_BUFFER_DISK_BUDGET_MB', 512) * 1024 * 1024
+            enforce_disk_budget(os.path.dirname(self.replay_path), budget)
+        return saved
+    
+    def load_replay_buffer(self, model):
+        """Restore the saved replay buffer (memory-mapped) so a warm start skips the fill phase"""
+        if not getattr(settings, 'RL_REPLAY_BUFFERS', True) or getattr(model, 'replay_buffer', None) is None:
+            return 0
+        loaded = load_replay_buffer(model.replay_buffer, self.replay_path)
+        if loaded:
+            print(f"Loaded {loaded} replay transitions for product {self.product_id}")
+        return loaded
+    
+    def numpy_policy_path(self):
+        """Path of an up-to-date NumPy export, exporting older models on first use"""
+        if not os.path.exists(self.policy_path) or (
+            os.path.getmtime(self.policy_path) < os.path.getmtime(self.model_zip_path)
+        ):
+            model = policy_cache.get(self.product_id, self.algorithm, self.model_zip_path)
+            if export_policy(model, self.policy_path) is None:
+                return None
+        return self.policy_path
+    
     def load_model(self):
-        if self.algorithm == 'DQN':
-            self.model = DQN.load(self.model_path)
-        elif self.algorithm == 'PPO':
-            self.model = PPO.load(self.model_path)
-        
-        self.env = self.create_env()
-        self.model.set_env(self.env)
+        # Shared, cached instance: only use it for predict()
+        path = self.model_zip_path
+        if getattr(settings, 'RL_NUMPY_INFERENCE', True):
+            path = self.numpy_policy_path() or path
+        self.model = policy_cache.get(self.product_id, self.algorithm, path)
         return self.model
     
+    def get_state(self):
+        """Current observation for this product, without building an env"""
+        return snapshot_observations(load_snapshots([self.product_id]))[0]
+    
     def predict_price_change(self, current_state=None):
         if self.model is None:
             self.load_or_create_model()
         
         if current_state is None:
-            current_state, _ = self.env.reset()
+            current_state = self.get_state()
         
         action, _ = self.model.predict(current_state, deterministic=True)
-        return action
+        return float(PRICE_CHANGE_PERCENTAGES[action])
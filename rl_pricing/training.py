@@ -0,0 +1,100 @@
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+def _init_worker(torch_threads):
+    """Process pool initializer: own Django setup, fresh DB connections, capped torch threads"""
+    import django
+    django.setup()
+    connections.close_all()
+
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def process_pool(workers):
+    """Pool of ``workers`` spawned training processes, each set up by ``_init_worker``"""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(getattr(settings, 'RL_TRAINING_TORCH_THREADS', 1),)
+    )
+
+
+def train_product(product_id, timesteps=1000, algorithm='DQN', incremental=False):
+    """
+    Train one product's model and record the outcome as a TrainingSession,
+    whose metrics are refreshed while training runs and on completion.
+    ``incremental`` warm-starts from the saved model when possible.
+
+    Returns a plain dict so it can cross process boundaries.
+    """
+    from rl_pricing.callbacks import format_metrics
+    from rl_pricing.models import TrainingSession
+    from rl_pricing.trainer import PricingModelTrainer
+
+    started = time.perf_counter()
+    session = None
+    trainer = None
+    error = ''
+    try:
+        trainer = PricingModelTrainer(product_id, algorithm=algorithm)
+        session = TrainingSession.objects.create(model=trainer.get_model_record())
+        trainer.train(total_timesteps=timesteps, incremental=incremental, session=session)
+    except Exception:
+        error = traceback.format_exc()
+
+    duration = time.perf_counter() - started
+    run = (trainer.last_run if trainer else None) or {
+        'mode': 'full', 'timesteps': timesteps, 'reason': None, 'metrics': session.metrics if session else {}
+    }
+    if session is not None:
+        session.completed_at = timezone.now()
+        session.successful = not error
+        # A run that failed mid-training keeps the last metrics it flushed
+        session.metrics = run['metrics'] or session.metrics
+        summary = f"{run['mode'].capitalize()} training: {run['timesteps']} timesteps in {duration:.2f}s"
+        if run['reason']:
+            summary += f" (fell back to full training: {run['reason']})"
+        if session.metrics:
+            summary += f"\n{format_metrics(session.metrics)}"
+        session.log_output = error or summary
+        session.save(update_fields=['completed_at', 'successful', 'log_output', 'metrics'])
+
+    return {
+        'product_id': product_id,
+        'successful': not error,
+        'duration': duration,
+        'mode': run['mode'],
+        'timesteps': run['timesteps'],
+        'error': error.strip().splitlines()[-1] if error else '',
+    }
+
+
+def train_products(product_ids, timesteps=1000, algorithm='DQN', workers=None, chunk_size=1, incremental=False):
+    """
+    Train many products, yielding one result dict per product as it finishes.
+
+    With ``workers`` > 1 products are spread over a pool of spawned processes,
+    each with its own DB connections and ``RL_TRAINING_TORCH_THREADS`` torch
+    threads. Spawned workers need a non-daemonic parent, so Celery must run
+    with ``--pool=solo`` (or threads) to use this from a task.
+    """
+    if workers is None:
+        workers = getattr(settings, 'RL_TRAINING_WORKERS', 1)
+    train = partial(train_product, timesteps=timesteps, algorithm=algorithm, incremental=incremental)
+
+    if workers <= 1:
+        for product_id in product_ids:
+            yield train(product_id)
+        return
+
+    with process_pool(workers) as executor:
+        yield from executor.map(train, product_ids, chunksize=chunk_size)
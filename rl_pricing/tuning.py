@@ -0,0 +1,293 @@
+"""
+Hyperparameter tuning by successive halving.
+
+Every group (one product, or a sample of a category's products) starts with
+``configs`` configurations drawn from the search space, each trained for
+``min_timesteps`` on the simulated environment and scored by its mean
+evaluation reward. Only the best 1/eta of a group's configurations move on
+to the next rung, which trains them eta times longer from the previous
+rung's checkpoint. Weak configurations are stopped after the first rung, so
+the sweep costs a fraction of training the whole grid to the final budget.
+
+Trials of all groups in a rung run together on one process pool. Each trial
+is recorded as a TrainingSession and the winner of a group is stored in
+``RLModel.hyperparameters`` for every product it covers, where
+``PricingModelTrainer`` picks it up on the next full training run.
+"""
+import itertools
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import traceback
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rl_pricing.training import process_pool
+
+# Values tried per hyperparameter; RL_TUNING_SEARCH_SPACE overrides entries per algorithm
+SEARCH_SPACE = {
+    'DQN': {
+        'learning_rate': [1e-4, 3e-4, 1e-3],
+        'batch_size': [32, 64, 128],
+        'learning_starts': [100, 500, 1000],
+        'gamma': [0.9, 0.95, 0.99],
+        'train_freq': [1, 4],
+        'target_update_interval': [250, 1000],
+    },
+    'PPO': {
+        'learning_rate': [1e-4, 3e-4, 1e-3],
+        'n_steps': [256, 512, 1024, 2048],
+        'batch_size': [32, 64, 128],
+        'gamma': [0.9, 0.95, 0.99],
+        'ent_coef': [0.0, 0.01],
+    },
+}
+
+
+def search_space(algorithm):
+    return {**SEARCH_SPACE[algorithm], **getattr(settings, 'RL_TUNING_SEARCH_SPACE', {}).get(algorithm, {})}
+
+
+def sample_configs(space, count, seed=0):
+    """``count`` distinct configurations from the grid over ``space`` (the whole grid when it is smaller)"""
+    names = sorted(space)
+    grid = list(itertools.product(*(space[name] for name in names)))
+    if count < len(grid):
+        grid = random.Random(seed).sample(grid, count)
+    return [dict(zip(names, values)) for values in grid]
+
+
+def rung_budgets(configs, min_timesteps, eta, max_timesteps=None):
+    """
+    (configurations kept, timesteps) per rung: ceil(n / eta) survivors train
+    eta times longer, until one is left or the next budget exceeds
+    ``max_timesteps``.
+    """
+    rungs = [(configs, min_timesteps)]
+    while rungs[-1][0] > 1:
+        survivors = math.ceil(rungs[-1][0] / eta)
+        timesteps = rungs[-1][1] * eta
+        if max_timesteps is not None and timesteps > max_timesteps:
+            break
+        rungs.append((survivors, timesteps))
+    return rungs
+
+
+def select_survivors(alive, scores, keep):
+    """The ``keep`` best of the ``alive`` configuration indexes by score, best first"""
+    return sorted(alive, key=lambda index: scores[index], reverse=True)[:keep]
+
+
+def run_trial(trial):
+    """
+    Train one configuration on one product up to ``trial['timesteps']``,
+    continuing from its checkpoint of the previous rung, and score it by
+    the mean reward of deterministic evaluation episodes.
+
+    Returns a plain dict so it can cross process boundaries; ``timesteps``
+    is the number of steps trained in this rung.
+    """
+    from stable_baselines3 import DQN, PPO
+    from stable_baselines3.common.evaluation import evaluate_policy
+    from rl_pricing.callbacks import TrainingMetricsCallback
+    from rl_pricing.replay import load_replay_buffer, save_replay_buffer
+    from rl_pricing.trainer import DEFAULT_HYPERPARAMS, PricingModelTrainer
+
+    started = time.perf_counter()
+    checkpoint = trial['checkpoint']
+    score = None
+    timesteps = 0
+    metrics = {}
+    error = ''
+    try:
+        trainer = PricingModelTrainer(trial['product_id'], algorithm=trial['algorithm'])
+        trainer.env = trainer.create_env()
+        if os.path.exists(f"{checkpoint}.zip"):
+            model_class = DQN if trial['algorithm'] == 'DQN' else PPO
+            model = model_class.load(f"{checkpoint}.zip", env=trainer.env)
+            if getattr(model, 'replay_buffer', None) is not None:
+                load_replay_buffer(model.replay_buffer, f"{checkpoint}_replay")
+        else:
+            hyperparameters = {**DEFAULT_HYPERPARAMS[trial['algorithm']], **trial['config']}
+            model = trainer.build_model({**hyperparameters, 'seed': trial['seed']})
+
+        start = model.num_timesteps
+        remaining = trial['timesteps'] - start
+        if remaining > 0:
+            callback = TrainingMetricsCallback()
+            with connection.execute_wrapper(callback.time_query):
+                model.learn(total_timesteps=remaining, callback=callback, reset_num_timesteps=False)
+            metrics = callback.metrics()
+        # Only this rung's steps: earlier rungs were already counted
+        timesteps = int(model.num_timesteps - start)
+        model.save(checkpoint)
+        if getattr(model, 'replay_buffer', None) is not None:
+            save_replay_buffer(model.replay_buffer, f"{checkpoint}_replay")
+
+        score, _ = evaluate_policy(model, trainer.env, n_eval_episodes=trial['eval_episodes'], deterministic=True)
+        score = float(score)
+    except Exception:
+        error = traceback.format_exc()
+
+    return {
+        'group': trial['group'],
+        'config_index': trial['config_index'],
+        'product_id': trial['product_id'],
+        'rung': trial['rung'],
+        'score': score,
+        'timesteps': timesteps,
+        'metrics': metrics,
+        'duration': time.perf_counter() - started,
+        'error': error,
+    }
+
+
+def _record_trials(results, configs, algorithm):
+    """One TrainingSession per trial, with its configuration and score"""
+    from rl_pricing.models import TrainingSession
+    from rl_pricing.trainer import PricingModelTrainer
+
+    records = {}
+    sessions = []
+    for result in results:
+        product_id = result['product_id']
+        if product_id not in records:
+            records[product_id] = PricingModelTrainer(product_id, algorithm=algorithm).get_model_record()
+        if result['error']:
+            log_output = result['error']
+        else:
+            log_output = (
+                f"Tuning rung {result['rung']}: trained {result['timesteps']} timesteps in "
+                f"{result['duration']:.2f}s, mean reward {result['score']:.4f}"
+            )
+        sessions.append(TrainingSession(
+            model=records[product_id],
+            completed_at=timezone.now(),
+            successful=not result['error'],
+            log_output=log_output,
+            hyperparameters=configs[result['group']][result['config_index']],
+            score=result['score'],
+            metrics=result['metrics']
+        ))
+    TrainingSession.objects.bulk_create(sessions)
+
+
+def apply_hyperparameters(product_ids, algorithm, hyperparameters):
+    """Store tuned hyperparameters on the products' RLModel rows, creating missing ones"""
+    from rl_pricing.models import RLModel
+    from rl_pricing.trainer import model_records
+
+    model_records(product_ids, algorithm)
+    return RLModel.objects.filter(product_id__in=product_ids, algorithm=algorithm).update(
+        hyperparameters=hyperparameters
+    )
+
+
+def tune(groups, algorithm='DQN', configs=9, min_timesteps=2000, max_timesteps=None, eta=3,
+         workers=None, eval_episodes=1, seed=0, apply=True):
+    """
+    Successive halving over ``groups``: a dict of group name to
+    (trial product ids, product ids the winner is applied to). Each
+    configuration's score in a group is its mean over the trial products.
+
+    Yields one result dict per group once the sweep finishes.
+    """
+    if not groups:
+        return
+    if workers is None:
+        workers = getattr(settings, 'RL_TRAINING_WORKERS', 1)
+    space = search_space(algorithm)
+    group_configs = {name: sample_configs(space, configs, seed=seed) for name in groups}
+    alive = {name: list(range(len(group_configs[name]))) for name in groups}
+    scores = {name: {} for name in groups}
+    spent = {name: 0 for name in groups}
+    rungs = rung_budgets(max(len(c) for c in group_configs.values()), min_timesteps, eta, max_timesteps)
+    numbers = {name: number for number, name in enumerate(groups)}
+    checkpoints = tempfile.mkdtemp(prefix='rl_tuning_', dir=getattr(settings, 'RL_TUNING_DIR', None))
+
+    executor = process_pool(workers) if workers > 1 else None
+    try:
+        for rung, (_, timesteps) in enumerate(rungs):
+            trials = [
+                {
+                    'group': name,
+                    'config_index': index,
+                    'config': group_configs[name][index],
+                    'product_id': product_id,
+                    'algorithm': algorithm,
+                    'rung': rung,
+                    'timesteps': timesteps,
+                    'eval_episodes': eval_episodes,
+                    'seed': seed,
+                    'checkpoint': os.path.join(checkpoints, f"{numbers[name]}_{index}_{product_id}"),
+                }
+                for name, (trial_ids, _) in groups.items()
+                for index in alive[name]
+                for product_id in trial_ids
+            ]
+            results = list(executor.map(run_trial, trials) if executor else map(run_trial, trials))
+            _record_trials(results, group_configs, algorithm)
+
+            rung_scores = {}
+            for result in results:
+                spent[result['group']] += result['timesteps']
+                # A configuration that fails on any trial product is out
+                score = result['score'] if result['score'] is not None else -math.inf
+                rung_scores.setdefault((result['group'], result['config_index']), []).append(score)
+            for (name, index), values in rung_scores.items():
+                scores[name][index] = sum(values) / len(values)
+
+            if rung + 1 < len(rungs):
+                keep = rungs[rung + 1][0]
+                for name in groups:
+                    alive[name] = select_survivors(alive[name], scores[name], keep)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(checkpoints, ignore_errors=True)
+
+    final_timesteps = rungs[-1][1]
+    for name, (trial_ids, product_ids) in groups.items():
+        best = max(alive[name], key=lambda index: scores[name][index])
+        config = group_configs[name][best]
+        score = scores[name][best]
+        applied = 0
+        if apply and score > -math.inf:
+            applied = apply_hyperparameters(product_ids, algorithm, config)
+        yield {
+            'group': name,
+            'config': config,
+            'score': score if score > -math.inf else None,
+            'products': applied,
+            'timesteps': spent[name],
+            # What training every sampled configuration to the final budget would cost
+            'grid_timesteps': len(group_configs[name]) * final_timesteps * len(trial_ids),
+        }
+
+
+def tuning_groups(scope='category', category_ids=None, sample_size=3, seed=0):
+    """
+    RL products grouped for ``tune``: one group per product, or one per
+    category whose trials run on up to ``sample_size`` of its products.
+    """
+    from products.models import Product
+
+    products = Product.objects.filter(pricing_strategy='RL')
+    if category_ids:
+        products = products.filter(category_id__in=category_ids)
+    rows = list(products.order_by('id').values_list('id', 'name', 'category_id', 'category__name'))
+
+    if scope == 'product':
+        return {f"{name} (#{product_id})": ([product_id], [product_id]) for product_id, name, _, _ in rows}
+
+    categories = {}
+    for product_id, _, category_id, category in rows:
+        categories.setdefault(f"{category} (#{category_id})", []).append(product_id)
+    rng = random.Random(seed)
+    return {
+        category: (sorted(rng.sample(product_ids, min(sample_size, len(product_ids)))), product_ids)
+        for category, product_ids in categories.items()
+    }
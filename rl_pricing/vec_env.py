@@ -0,0 +1,115 @@
+import time
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from rl_pricing.state import PRICE_CHANGE_PERCENTAGES, load_snapshots, snapshot_observations
+
+
+class ProductPricingVecEnv(VecEnv):
+    """
+    Vectorized, in-memory pricing environment for N products at once.
+
+    Every product follows the same dynamics as ``ProductPricingEnv(simulate=True)``
+    but the whole catalog is stepped with single array operations over (N,)
+    columns. Finished episodes are reset automatically, as SB3 expects.
+    """
+
+    def __init__(self, product_ids, max_steps=100):
+        self.snapshot = load_snapshots(product_ids)
+        self.product_ids = self.snapshot['ids']
+        self.max_steps = max_steps
+        num_envs = len(self.product_ids)
+
+        action_space = spaces.Discrete(len(PRICE_CHANGE_PERCENTAGES))
+
+        # One space has to fit every product, so use the widest price bounds
+        INF = np.finfo(np.float32).max
+        min_price = self.snapshot['min_price'].min()
+        max_price = self.snapshot['max_price'].max()
+        observation_space = spaces.Box(
+            low=np.array([min_price, min_price, 0, 0, 0], dtype=np.float32),
+            high=np.array([max_price, max_price, INF, 30, INF], dtype=np.float32),
+            dtype=np.float32
+        )
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.prices = self.snapshot['current_price'].copy()
+        self.sales_count = self.snapshot['sales_count'].copy()
+        self.days_since_last = self.snapshot['days_since_last'].copy()
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.episode_returns = np.zeros(num_envs, dtype=np.float64)
+        self.episode_start = np.full(num_envs, time.time())
+        self._actions = None
+
+    def observations(self):
+        """Current (N, 5) observation matrix"""
+        return snapshot_observations(self.snapshot, self.prices, self.sales_count, self.days_since_last)
+
+    def _reset_products(self, mask):
+        self.prices[mask] = self.snapshot['current_price'][mask]
+        self.sales_count[mask] = self.snapshot['sales_count'][mask]
+        self.days_since_last[mask] = self.snapshot['days_since_last'][mask]
+        self.current_step[mask] = 0
+        self.episode_returns[mask] = 0.0
+        self.episode_start[mask] = time.time()
+
+    def reset(self):
+        self._reset_products(slice(None))
+        self._reset_seeds()
+        self._reset_options()
+        return self.observations()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        price_change = PRICE_CHANGE_PERCENTAGES[self._actions]
+        new_prices = np.clip(
+            self.prices * (1 + price_change),
+            self.snapshot['min_price'],
+            self.snapshot['max_price']
+        )
+        self.prices = new_prices
+
+        # Every step logs a history row, which counts as a sale "today"
+        self.sales_count += 1
+        self.days_since_last[:] = 0.0
+
+        rewards = ((new_prices - self.snapshot['cost_price']) / new_prices).astype(np.float32)
+        self.episode_returns += rewards
+        self.current_step += 1
+        dones = self.current_step >= self.max_steps
+
+        obs = self.observations()
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            now = time.time()
+            for i in np.flatnonzero(dones):
+                infos[i]['terminal_observation'] = obs[i].copy()
+                infos[i]['TimeLimit.truncated'] = False
+                infos[i]['episode'] = {
+                    'r': float(self.episode_returns[i]),
+                    'l': int(self.current_step[i]),
+                    't': round(now - self.episode_start[i], 6),
+                }
+            self._reset_products(dones)
+            obs = self.observations()
+
+        return obs, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]